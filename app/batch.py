@@ -0,0 +1,136 @@
+import argparse
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+from src.books import Book, Books
+from src.configurations import load_config
+from src.filingmonth import FilingMonth
+from src.loggerfactory import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+# Books which can be selected on the command line
+BOOK_CHOICES = {
+    Books.SALES.value.name: Books.SALES.value,
+    Books.PURCHASE.value.name: Books.PURCHASE.value,
+}
+
+
+def parse_fiscal_year(value: str) -> int:
+    """Parses a fiscal year given as its first year, e.g. `2080` or `2080/81`."""
+    try:
+        return int(value.split('/')[0])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid fiscal year: {value!r}")
+
+
+def parse_month_range(value: str) -> Tuple[int, int]:
+    """Parses a month or a range of months in fiscal order, e.g. `7` or `10-2`."""
+    first, _, last = value.partition('-')
+    try:
+        months = (int(first), int(last or first))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month range: {value!r}")
+    if not all(1 <= month <= 12 for month in months):
+        raise argparse.ArgumentTypeError(f"months must be between 1 and 12: {value!r}")
+    return months
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Generate the VAT reports of several months without the interactive menu, "
+                    "from the currently restored database.")
+    parser.add_argument(
+        "--fiscal-year", type=parse_fiscal_year, required=True,
+        help="fiscal year to generate, e.g. 2080 or 2080/81")
+    parser.add_argument(
+        "--months", type=parse_month_range, default=None,
+        help="month or range of months in fiscal order, e.g. 4-9 or 10-2 (default: the whole year)")
+    parser.add_argument(
+        "--books", nargs="+", choices=BOOK_CHOICES, default=list(BOOK_CHOICES),
+        help="books to generate (default: all)")
+    parser.add_argument(
+        "--single-query", action="store_true",
+        help="fetch all the months with one query over their span instead of one query per month; "
+             "with all books and the whole year, also saves the yearly 1L+ file")
+    return parser
+
+
+def generate_fiscal_year(fiscal_year: int, months: Optional[Tuple[int, int]], books: List[Book]) -> int:
+    """
+    Generates the reports of the books for the months of the fiscal year from a single query.
+
+    Args:
+        fiscal_year (int): The year in which the fiscal year starts.
+        months (Optional[Tuple[int, int]]): The first and last month, in fiscal order. Defaults to the whole year.
+        books (List[Book]): The books to generate, the yearly 1L+ file is included with all books.
+
+    Returns:
+        int: The exit status, 0 if the reports were generated and 1 otherwise.
+    """
+    from src.report_generator import ReportGenerator
+
+    book = books[0] if len(books) == 1 else None
+    first_month = FilingMonth.from_fiscal_year(fiscal_year, months)[0]
+    try:
+        ReportGenerator(first_month, concurrent=True).generate_fiscal_year(book, months)
+    except Exception:
+        logger.exception(f"Failed to generate the {first_month.get_fiscal_year()} reports")
+        return 1
+    return 0
+
+
+def generate_reports(filing_months: Sequence[FilingMonth], books: List[Book]) -> int:
+    """
+    Generates the reports of the books for every filing month in one process, so
+    that the SQL engine, the CBMS token and the template cache are shared.
+
+    Args:
+        filing_months (Sequence[FilingMonth]): The months to generate the reports for.
+        books (List[Book]): The books to generate, the 1L+ file is included with all books.
+
+    Returns:
+        int: The exit status, 0 if every month was generated and 1 otherwise.
+    """
+    from src.report_generator import ReportGenerator
+
+    book = books[0] if len(books) == 1 else None
+    failed = []
+    for filing_month in filing_months:
+        label = f"{filing_month.nepali_month_name()} {filing_month.year}"
+        print(f"Generating {label} reports...")
+        try:
+            report_generator = ReportGenerator(
+                filing_month, batch_fetch=True, concurrent=True)
+            report_generator.generate(book)
+        except Exception:
+            logger.exception(f"Failed to generate the {label} reports")
+            failed.append(label)
+
+    if failed:
+        print(f"Failed to generate {len(failed)} of {len(filing_months)} months: {', '.join(failed)}")
+        return 1
+    print(f"Generated {len(filing_months)} months")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        filing_months = FilingMonth.from_fiscal_year(args.fiscal_year, args.months)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Parse the runtime configurations once, up front
+    load_config()
+
+    books = [BOOK_CHOICES[name] for name in dict.fromkeys(args.books)]
+    if args.single_query:
+        return generate_fiscal_year(args.fiscal_year, args.months, books)
+    return generate_reports(filing_months, books)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
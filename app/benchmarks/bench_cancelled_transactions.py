@@ -0,0 +1,76 @@
+"""
+Benchmark of cancelled transaction filtering on a synthetic month.
+
+Compares the former row-wise ``iterrows`` implementation against the
+boolean-mask implementation of :class:`src.report.Report`.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_cancelled_transactions [rows]
+"""
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import timeit
+
+import numpy as np
+import pandas as pd
+
+from src.books import Books
+from src.filingmonth import FilingMonth
+from src.report import AMOUNT_COLUMNS, CANCELLED_STATUS, Report
+
+
+def synthetic_transactions(rows: int, cancelled_ratio: float = 0.02) -> pd.DataFrame:
+    """Builds a raw transactions frame with a share of cancelled rows."""
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(100, 2_00_000, rows).round(2)
+    cancelled = rng.random(rows) < cancelled_ratio
+    return pd.DataFrame({
+        'Transaction ID': np.arange(rows),
+        'Grand Total': amounts,
+        'Total w Round': amounts,
+        'Taxable Amount': (amounts / 1.13).round(2),
+        'Tax Amount': (amounts - amounts / 1.13).round(2),
+        'Status': np.where(cancelled, CANCELLED_STATUS, '001-01'),
+        'Modify Type': np.where(cancelled, 'Cancel', ''),
+    })
+
+
+def iterrows_remove(report: Report, dataframe: pd.DataFrame) -> pd.DataFrame:
+    """The former row-wise removal of cancelled transactions."""
+    deleted_indices = []
+    for index, row in dataframe.iterrows():
+        if row['Status'] == CANCELLED_STATUS:
+            deleted_indices.append(index)
+            report.cancelled_transactions.append(row['Transaction ID'])
+    return dataframe.drop(deleted_indices)
+
+
+def iterrows_process(report: Report, dataframe: pd.DataFrame) -> pd.DataFrame:
+    """The former row-wise dashing of cancelled transactions."""
+    dataframe[AMOUNT_COLUMNS] = dataframe[AMOUNT_COLUMNS].astype(object)
+    for index, row in dataframe.iterrows():
+        if row['Status'] == CANCELLED_STATUS:
+            for col in AMOUNT_COLUMNS:
+                dataframe.loc[index, col] = '-'
+            report.cancelled_transactions.append(row['Transaction ID'])
+    return dataframe
+
+
+def main(rows: int = 200_000) -> None:
+    dataframe = synthetic_transactions(rows)
+    with TemporaryDirectory() as work_dir:
+        report = Report(Books.SALES.value, FilingMonth(2080, 7), Path(work_dir))
+        cases = {
+            'remove (iterrows)': lambda: iterrows_remove(report, dataframe.copy()),
+            'remove (mask)': lambda: report.remove_cancelled_transactions(dataframe.copy()),
+            'process (iterrows)': lambda: iterrows_process(report, dataframe.copy()),
+            'process (mask)': lambda: report.process_cancelled_transactions(dataframe.copy()),
+        }
+        print(f"Cancelled transaction filtering over {rows} rows:")
+        for name, case in cases.items():
+            print(f"{name:>20}: {timeit(case, number=1):.3f}s")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark of shaping the raw transactions to the book format.
+
+Compares the former path (repeated ``df.insert`` and a three-pass PAN
+conversion) against :meth:`src.report.Report.process_transactions`.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_process_transactions [rows]
+"""
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import timeit
+
+import numpy as np
+import pandas as pd
+
+from src.books import Books
+from src.filingmonth import FilingMonth
+from src.report import Report
+
+
+def synthetic_raw_transactions(rows: int, missing_pan_ratio: float = 0.3) -> pd.DataFrame:
+    """Builds raw purchase transactions with a share of missing PANs."""
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(100, 2_00_000, rows).round(2)
+    pans = rng.integers(100_000_000, 999_999_999, rows).astype(str)
+    pans[rng.random(rows) < missing_pan_ratio] = ''
+    return pd.DataFrame({
+        'Nepali Date': '2080.7.1',
+        'Reference No': np.arange(rows).astype(str),
+        'Bill Receiveable Person': 'Supplier',
+        'Vat Pan No': pd.Series(pans, dtype=object),
+        'Grand Total': amounts,
+        'Taxable Amount': (amounts / 1.13).round(2),
+        'Tax Amount': (amounts - amounts / 1.13).round(2),
+    })
+
+
+def insert_process(report: Report) -> pd.DataFrame:
+    """The former shaping of the transactions."""
+    df = report.raw_transactions.loc[:, report.book.columns.column_names]
+    for index in report.book.emptycols.indices:
+        df.insert(index, index, None)
+    df['Vat Pan No'] = df['Vat Pan No'].mask(df['Vat Pan No'] == '', 000)
+    df['Vat Pan No'] = df['Vat Pan No'].astype(int)
+    df['Vat Pan No'] = df['Vat Pan No'].mask(df['Vat Pan No'] == 000, '')
+    return df
+
+
+def main(rows: int = 200_000) -> None:
+    with TemporaryDirectory() as work_dir:
+        report = Report(Books.PURCHASE.value, FilingMonth(2080, 7), Path(work_dir))
+        report._raw_transactions = synthetic_raw_transactions(rows)
+
+        pd.testing.assert_frame_equal(report.process_transactions(), insert_process(report))
+
+        number = 10
+        former = timeit(lambda: insert_process(report), number=number) / number
+        assembled = timeit(report.process_transactions, number=number) / number
+        print(f"Processing {rows} transactions: insert {former * 1000:.1f}ms, "
+              f"single assembly {assembled * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
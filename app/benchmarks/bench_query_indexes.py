@@ -0,0 +1,51 @@
+"""
+Benchmark of the report query before and after provisioning the report indexes.
+
+Runs :meth:`src.report.Report.query_db` against a restored database, e.g. the
+``mssql`` service of docker-compose, then provisions the indexes configured in
+``runtime_config.yml`` and runs the query again. The indexes are created only if
+missing, so drop them first to measure a freshly restored backup.
+
+Usage (from the ``app`` directory, with SA_PASSWORD set):
+    python -m benchmarks.bench_query_indexes <year> <month> [repeat]
+"""
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import repeat as repeat_timer
+
+from drive_database.database_operations import provision_indexes
+from src.books import Books
+from src.db_connection import SQLEngine
+from src.filingmonth import FilingMonth
+from src.report import Report
+
+
+def time_queries(reports, repeat: int) -> dict:
+    """Returns the best query time of each report over `repeat` runs."""
+    return {
+        report.book.name: min(repeat_timer(report.query_db, number=1, repeat=repeat))
+        for report in reports
+    }
+
+
+def main(year: int, month: int, repeat: int = 3) -> None:
+    filing_month = FilingMonth(year, month)
+    with TemporaryDirectory() as work_dir:
+        reports = [
+            Report(book, filing_month, Path(work_dir))
+            for book in (Books.PURCHASE.value, Books.SALES.value)
+        ]
+        before = time_queries(reports, repeat)
+        provision_indexes()
+        # Mirror restore(), which drops the pooled connections afterwards
+        SQLEngine.dispose()
+        after = time_queries(reports, repeat)
+
+    print(f"Report query for {year}/{month:02}, best of {repeat}:")
+    for name in before:
+        print(f"{name:>10}: {before[name]:.3f}s -> {after[name]:.3f}s")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,85 @@
+"""
+Benchmark of writing the transactions into the report template.
+
+Compares the former three-pass path (save the template, re-parse it with
+``pd.read_excel`` and append with ``pd.ExcelWriter(mode='a')``) against the
+single-pass writer of :meth:`src.report.Report.populate_report_buffer`,
+in its normal and write-only modes.
+
+Usage (from the ``app`` directory):
+    python -m benchmarks.bench_report_writer [rows ...]
+"""
+import sys
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import timeit
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.books import Books
+from src.configurations import CompanyDetails
+from src.filingmonth import FilingMonth
+from src.report import Report
+
+
+TEMPLATE_PATH = Path(__file__).parents[1] / 'tests' / 'io_files' / 'sales.xlsx'
+DETAILS = CompanyDetails('123456789', 'BENCHMARK STORES')
+
+
+def synthetic_transactions(rows: int) -> pd.DataFrame:
+    """Builds a processed sales transactions frame."""
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(100, 2_00_000, rows).round(2)
+    return pd.DataFrame({
+        'Nepali Date': '2080.7.1',
+        'Transaction ID': np.arange(rows),
+        'Bill Receiveable Person': 'Customer',
+        'Vat Pan No': rng.integers(100_000_000, 999_999_999, rows),
+        'Grand Total': amounts,
+        5: None,
+        'Taxable Amount': (amounts / 1.13).round(2),
+        'Tax Amount': (amounts - amounts / 1.13).round(2),
+    })
+
+
+def overlay_populate(report: Report) -> None:
+    """The former read-modify-append population of the report buffer."""
+    report.fill_report_details()
+    reader = pd.read_excel(report.buffer, engine='openpyxl')
+    with pd.ExcelWriter(report.buffer, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
+        report.transactions.to_excel(
+            writer,
+            index=False,
+            header=False,
+            sheet_name=report.book.sheet,
+            startrow=len(reader) + 1,
+        )
+
+
+def main(*sizes: int) -> None:
+    template = TEMPLATE_PATH.read_bytes()
+    with TemporaryDirectory() as work_dir, \
+            patch('src.report.get_company_details', lambda: DETAILS), \
+            patch('src.report.Report.get_template_buffer', lambda _: BytesIO(template)):
+        for rows in sizes or (10_000, 50_000, 200_000):
+            report = Report(Books.SALES.value, FilingMonth(2080, 7), Path(work_dir))
+            report._transactions = synthetic_transactions(rows)
+
+            def run(populate, write_only=False):
+                report.buffer = BytesIO()
+                report.write_only = write_only
+                populate(report)
+
+            overlay = timeit(lambda: run(overlay_populate), number=1)
+            single_pass = timeit(lambda: run(Report.populate_report_buffer), number=1)
+            write_only = timeit(
+                lambda: run(Report.populate_report_buffer, write_only=True), number=1)
+            print(f"{rows:>7} rows: overlay {overlay:.3f}s, single pass {single_pass:.3f}s, "
+                  f"write-only {write_only:.3f}s")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
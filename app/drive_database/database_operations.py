@@ -1,47 +1,69 @@
 import os
 from pathlib import Path
+from time import perf_counter
+from typing import Optional, Tuple
 
 import pyodbc
 import tomli
+from drive_database.drive_cache import read_drive_cache, record_restore, update_latest_restore
+from drive_database.restore_progress import log_restore_messages
+from src.configurations import get_indexes, get_report_table_sql
+from src.db_connection import SQLEngine
 from src.loggerfactory import LoggerFactory
+from src.queries import create_index_if_missing
 
-from settings import DB_CONFIGURATION_PATH
+from settings import DB_CONFIGURATION_PATH, RESTORE_STATS_PERCENT, USE_REPORT_TABLE
 
 
 logger = LoggerFactory.get_logger(__name__)
 
 mssql_data = Path('/var/opt/mssql/data')
-logger.debug(f'Backup will be restored in {str(mssql_data)}')
 
-# Connection parameters
-logger.debug(f'Loading configruation from {DB_CONFIGURATION_PATH}')
-with open(DB_CONFIGURATION_PATH, 'rb') as config_file:
-    config_data: dict = tomli.load(config_file)
+# Connection parameters, loaded on first use
+_connection_settings: Optional[Tuple[str, str]] = None
 
-DRIVER = config_data['driver']['name']
-SERVER = config_data['server']['name']
-DATABASE_NAME = config_data['database']['name']
-UID = config_data['user']['name']
-PWD = os.getenv('SA_PASSWORD')
 
-database = 'master'
-connection_string = f"DRIVER={DRIVER};SERVER={SERVER};DATABASE={database};UID={UID};PWD={PWD}"
+def get_connection_settings() -> Tuple[str, str]:
+    """Returns the connection string to the master database and the name of the database to restore."""
+    global _connection_settings
+    if _connection_settings is None:
+        logger.debug(f'Loading configruation from {DB_CONFIGURATION_PATH}')
+        with open(DB_CONFIGURATION_PATH, 'rb') as config_file:
+            config_data: dict = tomli.load(config_file)
+
+        DRIVER = config_data['driver']['name']
+        SERVER = config_data['server']['name']
+        DATABASE_NAME = config_data['database']['name']
+        UID = config_data['user']['name']
+        PWD = os.getenv('SA_PASSWORD')
+
+        database = 'master'
+        connection_string = f"DRIVER={DRIVER};SERVER={SERVER};DATABASE={database};UID={UID};PWD={PWD}"
+        _connection_settings = (connection_string, DATABASE_NAME)
+    return _connection_settings
 
 
 def restore(
     filepath: Path,
-    connection_string=connection_string,
-    DATABASE_NAME=DATABASE_NAME,
+    connection_string: Optional[str] = None,
+    DATABASE_NAME: Optional[str] = None,
     mssql_data=mssql_data
-):
+) -> bool:
     """Restore the database from a backup file.
 
     Args:
         filepath (Path): The path to the backup file.
-        connection_string (str): The connection string for pyodbc.
-        DATABASE_NAME (str): The name of the database to be restored.
+        connection_string (str): The connection string for pyodbc. Defaults to the db_config.toml one.
+        DATABASE_NAME (str): The name of the database to be restored. Defaults to the db_config.toml one.
         mssql_data (Path): The path to the MS SQL data directory.
+
+    Returns:
+        bool: Whether the database was restored.
     """
+    default_connection_string, default_database_name = get_connection_settings()
+    connection_string = connection_string or default_connection_string
+    DATABASE_NAME = DATABASE_NAME or default_database_name
+    logger.debug(f'Backup will be restored in {str(mssql_data)}')
     logger.info("Attempting to establish connection...")
     # Create connection
     try:
@@ -78,24 +100,143 @@ def restore(
             logger.debug(
                 f"Executing RESTORE DATABASE for {DATABASE_NAME} from {filepath}...")
 
-            # Restore database from backup
+            # Restore database from backup, reporting progress every RESTORE_STATS_PERCENT percent
+            start = perf_counter()
             cursor.execute(f"""
                 RESTORE DATABASE {DATABASE_NAME} FROM DISK=N'{filepath}' WITH REPLACE,
+                STATS = {RESTORE_STATS_PERCENT},
                 MOVE '{files['D']['logical_name']}' TO '{mssql_data.joinpath(files['D']['physical_name'])}',
                 MOVE '{files['L']['logical_name']}' TO '{mssql_data.joinpath(files['L']['physical_name'])}'
                 """)
 
-            while cursor.nextset():
-                logger.info("Restoring database...")
+            stats = log_restore_messages(cursor)
+            duration = perf_counter() - start
 
             conn.commit()
     except pyodbc.Error as e:
         logger.error(f"Failed to connect to database: {e}")
-        return
+        return False
     except Exception as e:
         conn.rollback()
         logger.error(f"Failed to restore database: {e}")
+        return False
+
+    logger.info(
+        f"Database {DATABASE_NAME} backup restored successfully from {filepath} in {duration:.1f}s")
+    # The checksum is cached along with the name when the backup is downloaded
+    drive_cache = read_drive_cache()
+    md5_checksum = drive_cache.get('md5Checksum') if drive_cache.get('name') == Path(filepath).name else None
+    record_restore(Path(filepath).name, duration, stats and stats.mb_per_sec, md5_checksum)
+
+    # Pooled connections point at the database that was just replaced
+    SQLEngine.dispose()
+
+    provision_indexes(connection_string)
+
+    # Reports read the table only once the restore recorded it, see use_report_table
+    if USE_REPORT_TABLE and materialize_report_table(connection_string):
+        update_latest_restore({'report_table': True})
+
+    return True
+
+
+def get_restored_backup_name(connection_string: Optional[str] = None, DATABASE_NAME: Optional[str] = None) -> Optional[str]:
+    """Returns the file name of the backup the database was last restored from,
+    according to the restore history of msdb, or None if it is unknown.
+
+    Args:
+        connection_string (str): The connection string for pyodbc. Defaults to the db_config.toml one.
+        DATABASE_NAME (str): The name of the restored database. Defaults to the db_config.toml one.
+    """
+    default_connection_string, default_database_name = get_connection_settings()
+    connection_string = connection_string or default_connection_string
+    DATABASE_NAME = DATABASE_NAME or default_database_name
+    try:
+        with pyodbc.connect(connection_string, timeout=5) as conn:
+            row = conn.cursor().execute("""
+                SELECT TOP 1 BackupMediaFamily.physical_device_name
+                FROM msdb.dbo.restorehistory RestoreHistory
+                    JOIN msdb.dbo.backupset BackupSet
+                        ON BackupSet.backup_set_id = RestoreHistory.backup_set_id
+                    JOIN msdb.dbo.backupmediafamily BackupMediaFamily
+                        ON BackupMediaFamily.media_set_id = BackupSet.media_set_id
+                WHERE RestoreHistory.destination_database_name = ?
+                ORDER BY RestoreHistory.restore_date DESC
+                """, DATABASE_NAME).fetchone()
+    except pyodbc.Error as e:
+        logger.error(f"Failed to read the restore history: {e}")
+        return None
+
+    if row is None:
+        return None
+    return Path(row[0]).name
+
+
+def provision_indexes(connection_string: Optional[str] = None):
+    """Create the covering indexes of the report query which the restored
+    database is missing, then update the statistics of the indexed tables.
+    Each statement may fail on its own, e.g. on a differing schema, without
+    skipping the others.
+
+    Args:
+        connection_string (str): The connection string for pyodbc. Defaults to the db_config.toml one.
+    """
+    connection_string = connection_string or get_connection_settings()[0]
+    indexes = get_indexes()
+    logger.info("Provisioning report indexes...")
+    failures = 0
+    try:
+        with pyodbc.connect(connection_string, timeout=10) as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            start = perf_counter()
+            for index in indexes:
+                logger.debug(f"Ensuring index {index.name} on {index.table}")
+                try:
+                    cursor.execute(create_index_if_missing(*index))
+                except pyodbc.Error as e:
+                    failures += 1
+                    logger.error(f"Failed to create index {index.name} on {index.table}: {e}")
+            for table in dict.fromkeys(index.table for index in indexes):
+                logger.debug(f"Updating statistics of {table}")
+                try:
+                    cursor.execute(f"UPDATE STATISTICS {table};")
+                except pyodbc.Error as e:
+                    failures += 1
+                    logger.error(f"Failed to update the statistics of {table}: {e}")
+    except pyodbc.Error as e:
+        logger.error(f"Failed to provision the report indexes: {e}")
         return
 
     logger.info(
-        f"Database {DATABASE_NAME} backup restored successfully from {filepath}")
+        f"Report indexes provisioned in {perf_counter() - start:.2f}s"
+        + (f" with {failures} failed statements" if failures else ""))
+
+
+def materialize_report_table(connection_string: Optional[str] = None) -> bool:
+    """Materialize the report query into the indexed report table, so the
+    month reports read a range of it instead of joining the billing tables.
+
+    Args:
+        connection_string (str): The connection string for pyodbc. Defaults to the db_config.toml one.
+
+    Returns:
+        bool: Whether the report table was materialized.
+    """
+    connection_string = connection_string or get_connection_settings()[0]
+    logger.info("Materializing the report table...")
+    try:
+        with pyodbc.connect(connection_string, timeout=10) as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            start = perf_counter()
+            cursor.execute(get_report_table_sql())
+            while cursor.nextset():
+                pass
+    except pyodbc.Error as e:
+        logger.error(f"Failed to materialize the report table: {e}")
+        return False
+
+    logger.info(
+        f"Report table materialized in {perf_counter() - start:.2f}s")
+    return True
@@ -1,26 +1,42 @@
+import hashlib
 import logging
 from datetime import datetime
-import json
+import os
 from pathlib import Path
-from typing import Optional, TypedDict
-import io
+from typing import BinaryIO, Iterator, NotRequired, Optional, Tuple, TypedDict
 import re
+import time
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from httplib2 import HttpLib2Error
+from drive_database.drive_cache import read_drive_cache, update_drive_cache
+from src.exceptions import FileValidationError
 from src.loggerfactory import LoggerFactory
 
-from settings import DRIVE_CACHE_PATH
+from settings import (
+    BACKUP_DIR, DRIVE_BACKUP_PREFIX, DRIVE_DOWNLOAD_BACKOFF, DRIVE_DOWNLOAD_CHUNKSIZE,
+    DRIVE_DOWNLOAD_RETRIES, DRIVE_LISTING_TTL)
 
 
 logger = LoggerFactory.get_logger(__name__)
 
 
+# Metadata requested for the backup files
+DRIVE_FILE_FIELDS = "kind, mimeType, id, name, md5Checksum, size"
+
+# Statuses of transient Google Drive failures, after which a chunk is requested again
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
 class GoogleDriveFile(TypedDict):
     kind: str
     mimeType: str
     id: str
     name: str
+    md5Checksum: NotRequired[str]
+    size: NotRequired[str]
 
 
 def list_files(credentials: Credentials):
@@ -41,90 +57,297 @@ def list_files(credentials: Credentials):
             print(file['name'])
 
 
-def retrive_latest_file_by_pattern(credentials: Credentials, file_pattern: str) -> Optional[GoogleDriveFile]:
+def iter_drive_files(service, query: str, fields: str = DRIVE_FILE_FIELDS, page_size: int = 100) -> Iterator[GoogleDriveFile]:
+    """
+    Lazily yield the files matching the query, newest first, requesting the
+    next page only once the files of the previous one are consumed.
+
+    Args:
+        service: The Google Drive service.
+        query (str): The Google Drive search query.
+        fields (str): The fields of the files to request.
+        page_size (int): The number of files requested per page.
+    """
+    page_token = None
+    while True:
+        results = service.files().list(
+            q=query,
+            orderBy="modifiedTime desc",
+            pageSize=page_size,
+            pageToken=page_token,
+            fields=f"nextPageToken, files({fields})",
+        ).execute()
+        yield from results.get('files', [])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def retrive_latest_file_by_pattern(
+    credentials: Credentials,
+    file_pattern: str,
+    name_prefix: str = DRIVE_BACKUP_PREFIX,
+) -> Optional[GoogleDriveFile]:
     """
     Retrieve the latest file from Google Drive that matches the specified pattern.
 
+    Google Drive only lists the files containing the name prefix, page by page,
+    until one of them matches the pattern. The match is cached for DRIVE_LISTING_TTL
+    seconds in drive_cache.json and returned without listing again meanwhile.
+
     Args:
     - credentials: The credentials for accessing Google Drive API.
     - file_pattern: The pattern to match the file name.
+    - name_prefix: The text which the names of the matching files contain.
 
     Returns:
     - The metadata of the latest matching file, or None if no file is found.
     """
     logger.info(f"Retrieving the latest file by pattern: {file_pattern}")
-    # Build the Google Drive service using the obtained credentials
-    service = build('drive', 'v3', credentials=credentials)
-
-    query = "trashed=false"
-
-    results = service.files().list(
-        q=query,
-        orderBy="modifiedTime desc",
-    ).execute()
-
-    items = results.get('files', [])
 
     # Validate the file pattern
     try:
-        re.compile(file_pattern)
+        pattern = re.compile(file_pattern)
     except re.error:
         logger.error(f"Invalid regular expression pattern: '{file_pattern}'")
         return None
 
+    listing = read_drive_cache().get('listing')
+    if listing and listing['pattern'] == file_pattern \
+            and time.time() - listing['listed_at'] < DRIVE_LISTING_TTL:
+        logger.debug(f"Using the latest file listed at {datetime.fromtimestamp(listing['listed_at'])}")
+        return listing['file']
+
+    # Build the Google Drive service using the obtained credentials
+    service = build('drive', 'v3', credentials=credentials)
+
+    escaped_prefix = name_prefix.replace('\\', '\\\\').replace("'", "\\'")
+    query = f"name contains '{escaped_prefix}' and trashed=false"
+
     # Filter files by the specified pattern
-    matching_items = [file for file in items if re.search(
-        file_pattern, file['name'])]
+    latest_file = next(
+        (file for file in iter_drive_files(service, query) if pattern.search(file['name'])),
+        None)
 
-    if not matching_items:
+    if latest_file is None:
         logger.info(f"No file matching the pattern '{file_pattern}' found.")
         return None
 
-    logger.debug(f"Total matching files: {len(matching_items)}")
+    update_drive_cache({'listing': {
+        'pattern': file_pattern,
+        'listed_at': time.time(),
+        'file': latest_file,
+    }})
+    return latest_file
 
-    latest_file = matching_items[0]
 
-    return latest_file
+def download_media(
+    request: HttpRequest,
+    file: BinaryIO,
+    offset: int = 0,
+    chunksize: int = DRIVE_DOWNLOAD_CHUNKSIZE,
+    retries: int = DRIVE_DOWNLOAD_RETRIES,
+    md5=None,
+    backoff: float = DRIVE_DOWNLOAD_BACKOFF,
+) -> Tuple[int, str]:
+    """
+    Stream the media of a request into a file with ranged requests of `chunksize`
+    bytes, starting at `offset`, so that only one chunk is held in memory at a time.
 
+    Args:
+        request (HttpRequest): The media request, e.g. from `files().get_media`.
+        file (BinaryIO): The file to append the media to, already holding `offset` bytes.
+        offset (int): The number of bytes already downloaded.
+        chunksize (int): The number of bytes requested at a time.
+        retries (int): The number of times a chunk is requested again after a dropped
+            connection or a transient error (429 or 5xx).
+        md5: A hashlib md5 object already fed with the first `offset` bytes,
+            which is updated with every chunk as it is written.
+        backoff (float): The seconds to wait before the first retry, doubled on every next one.
+
+    Returns:
+        Tuple[int, str]: The size and md5 checksum of the downloaded media.
 
-def download_drive_file(credentials: Credentials, drive_file: GoogleDriveFile):
+    Raises:
+        HttpError: If the media can not be downloaded.
+    """
+    if md5 is None:
+        md5 = hashlib.md5()
+    total = None
+    attempts = 0
+    while total is None or offset < total:
+        headers = {'range': f'bytes={offset}-{offset + chunksize - 1}'}
+        try:
+            response, content = request.http.request(
+                request.uri, method='GET', headers=headers)
+        except (HttpLib2Error, OSError) as e:
+            error = e
+        else:
+            if response.status == 416 and offset:
+                # The file was complete already
+                return offset, md5.hexdigest()
+            if response.status == 206 and not content:
+                # Retrying keeps the offset, instead of requesting the same range forever
+                error = HttpError(response, b'Empty partial content', uri=request.uri)
+            elif response.status in (200, 206):
+                error = None
+            elif response.status in RETRYABLE_STATUSES:
+                error = HttpError(response, content, uri=request.uri)
+            else:
+                raise HttpError(response, content, uri=request.uri)
+
+        if error is not None:
+            attempts += 1
+            if attempts > retries:
+                raise error
+            delay = backoff * 2 ** (attempts - 1)
+            logger.warning(f"Download interrupted at {offset} bytes, retrying in {delay}s: {error}")
+            time.sleep(delay)
+            continue
+        attempts = 0
+
+        if response.status == 200:
+            # The whole media was sent regardless of the range
+            file.truncate(0)
+            offset = 0
+            total = len(content)
+            md5 = hashlib.md5()
+        else:
+            total = int(response['content-range'].rsplit('/', 1)[1])
+        file.write(content)
+        md5.update(content)
+        offset += len(content)
+        logger.info(f"Downloaded {offset * 100 // max(total, 1)}%")
+    return offset, md5.hexdigest()
+
+
+def hash_file(file_path: Path, chunksize: int = DRIVE_DOWNLOAD_CHUNKSIZE):
     """
-    Download a file from Google Drive.
+    Returns a hashlib md5 object fed with the contents of the file, read in chunks.
+
+    Args:
+        file_path (Path): The file to hash.
+        chunksize (int): The number of bytes read at a time.
+    """
+    md5 = hashlib.md5()
+    with file_path.open('rb') as file:
+        while chunk := file.read(chunksize):
+            md5.update(chunk)
+    return md5
+
+
+def is_verified(file_path: Path, drive_file: GoogleDriveFile) -> bool:
+    """
+    Checks whether the local file was verified against the md5 checksum of the
+    drive file and left unchanged since, according to drive_cache.json.
+
+    Args:
+        file_path (Path): The local copy of the drive file.
+        drive_file (GoogleDriveFile): The drive file.
+    """
+    verified = read_drive_cache().get('verified', {}).get(drive_file['name'])
+    if verified is None or 'md5Checksum' not in drive_file:
+        return False
+    stat = file_path.stat()
+    return (
+        verified['md5Checksum'] == drive_file['md5Checksum']
+        and verified['size'] == stat.st_size
+        and verified['mtime_ns'] == stat.st_mtime_ns
+    )
+
+
+def validate_download(file_path: Path, drive_file: GoogleDriveFile, md5_checksum: str) -> None:
+    """
+    Validates the local file against the size and md5 checksum of the drive file, if known.
+
+    Args:
+        file_path (Path): The local copy of the drive file.
+        drive_file (GoogleDriveFile): The drive file.
+        md5_checksum (str): The md5 checksum of the local file.
+
+    Raises:
+        FileValidationError: If the size or checksum does not match.
+    """
+    size = file_path.stat().st_size
+    if 'size' in drive_file and int(drive_file['size']) != size:
+        raise FileValidationError(
+            f"Size of {file_path} does not match Google Drive. Expected: {drive_file['size']}, Got: {size}")
+    if 'md5Checksum' in drive_file and drive_file['md5Checksum'] != md5_checksum:
+        raise FileValidationError(
+            f"MD5 checksum of {file_path} does not match Google Drive. "
+            f"Expected: {drive_file['md5Checksum']}, Got: {md5_checksum}")
+
+
+def download_drive_file(credentials: Credentials, drive_file: GoogleDriveFile, backup_dir: Optional[Path] = None):
+    """
+    Download a file from Google Drive, streaming it into a partial file which is
+    resumed by the next download after a dropped connection, and renamed once complete.
+
+    The file is hashed while it is written and validated against the md5 checksum
+    and size of the drive file. Verified files are recorded in drive_cache.json,
+    so later runs skip both the download and the hashing while the file is unchanged.
+    An existing file which fails validation is downloaded again.
 
     Args:
         credentials (Credentials): The credentials to authenticate the Google Drive API.
         drive_file (GoogleDriveFile): The file to be downloaded from Google Drive.
+        backup_dir (Optional[Path]): The directory to download into. Defaults to BACKUP_DIR.
 
     Returns:
         Path: The path to the downloaded file.
 
     Raises:
-        None
+        HttpError: If the file can not be downloaded.
+        FileValidationError: If the downloaded file does not match the drive file.
     """
     logger.info(f"Downloading Google Drive file: {drive_file['name']}")
+    file_path = (backup_dir or BACKUP_DIR) / drive_file['name']
+
+    if file_path.exists():
+        if is_verified(file_path, drive_file):
+            logger.info(f"File already exists and is verified: {file_path}")
+            cache_it(drive_file)
+            return file_path
+        md5_checksum = hash_file(file_path).hexdigest()
+        try:
+            validate_download(file_path, drive_file, md5_checksum)
+        except FileValidationError as e:
+            logger.warning(f"{e}, downloading it again")
+            file_path.unlink()
+        else:
+            logger.info(f"File already exists: {file_path}")
+            cache_it(drive_file, file_path, md5_checksum)
+            return file_path
+
     service = build('drive', 'v3', credentials=credentials)
 
     # Download the drive file
     request = service.files().get_media(fileId=drive_file['id'])
 
-    file_path = Path('/backup') / drive_file['name']
+    partial_path = file_path.with_name(f"{file_path.name}.part")
+    offset = 0
+    md5 = hashlib.md5()
+    if partial_path.exists():
+        # The resumed download is hashed from the partial file onwards
+        md5 = hash_file(partial_path)
+        offset = partial_path.stat().st_size
+        logger.info(f"Resuming download from {offset} bytes")
 
-    if file_path.exists():
-        logger.info(f"File already exists: {file_path}")
-        cache_it(drive_file)
-        return file_path
-
-    file = io.BytesIO()
-    downloader = MediaIoBaseDownload(file, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-        logger.info(f"Downloaded {int(status.progress() * 100)}%")
-
-    file_path.write_bytes(file.getvalue())
+    with partial_path.open('ab') as file:
+        _, md5_checksum = download_media(
+            request, file, offset, DRIVE_DOWNLOAD_CHUNKSIZE, DRIVE_DOWNLOAD_RETRIES, md5,
+            DRIVE_DOWNLOAD_BACKOFF)
+
+    try:
+        validate_download(partial_path, drive_file, md5_checksum)
+    except FileValidationError:
+        # A corrupt partial file must not be resumed
+        partial_path.unlink()
+        raise
+    os.replace(partial_path, file_path)
     logger.info(f"File write complete {file_path}")
 
-    cache_it(drive_file)
+    cache_it(drive_file, file_path, md5_checksum)
 
     return file_path
 
@@ -132,21 +355,29 @@ def download_drive_file(credentials: Credentials, drive_file: GoogleDriveFile):
 logger = logging.getLogger(__name__)
 
 
-def cache_it(drive_file: GoogleDriveFile):
+def cache_it(drive_file: GoogleDriveFile, file_path: Optional[Path] = None, md5_checksum: Optional[str] = None):
     """
-    Caches information about the drive file.
+    Caches information about the drive file, updating the other contents of the cache.
 
     Args:
         drive_file (GoogleDriveFile): The drive file to cache information about.
+        file_path (Optional[Path]): The local copy of the drive file, if it was just verified.
+        md5_checksum (Optional[str]): The md5 checksum of the verified local copy.
     """
     logger.info("Caching information about the drive file...")
 
-    try:
-        with DRIVE_CACHE_PATH.open('w', encoding='utf-8') as f:
-            content = {
-                'datetime': datetime.now().isoformat(),
-                'name': drive_file['name']
-            }
-            json.dump(content, f)
-    except (IOError, json.JSONDecodeError) as e:
-        logger.error(f"Error occurred during file operation: {e}")
+    content = {
+        'datetime': datetime.now().isoformat(),
+        'name': drive_file['name'],
+        'md5Checksum': drive_file.get('md5Checksum'),
+    }
+    if file_path is not None and md5_checksum is not None:
+        stat = file_path.stat()
+        # Only the latest backup is kept verified
+        content['verified'] = {drive_file['name']: {
+            'md5Checksum': md5_checksum,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }}
+    update_drive_cache(content)
+
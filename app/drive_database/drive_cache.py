@@ -0,0 +1,80 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from settings import DRIVE_CACHE_PATH
+
+from src.loggerfactory import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+# Number of restores kept in the restore history
+RESTORE_HISTORY_LENGTH = 50
+
+
+def read_drive_cache() -> dict:
+    """Returns the contents of drive_cache.json, or an empty dict if there are none."""
+    try:
+        with DRIVE_CACHE_PATH.open('r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return {}
+
+
+def update_drive_cache(content: dict) -> None:
+    """
+    Updates drive_cache.json with the content, keeping its other keys.
+
+    Args:
+        content (dict): The keys to update.
+    """
+    cache = read_drive_cache()
+    cache.update(content)
+    try:
+        with DRIVE_CACHE_PATH.open('w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except (IOError, json.JSONDecodeError) as e:
+        logger.error(f"Error occurred during file operation: {e}")
+
+
+def record_restore(
+    name: str,
+    duration: float,
+    mb_per_sec: Optional[float] = None,
+    md5_checksum: Optional[str] = None,
+) -> None:
+    """
+    Appends a restore to the restore history of drive_cache.json, keeping the
+    latest RESTORE_HISTORY_LENGTH restores. The latest restore identifies the
+    data of the database, e.g. for the transaction snapshots.
+
+    Args:
+        name (str): The name of the restored backup file.
+        duration (float): The duration of the restore in seconds.
+        mb_per_sec (Optional[float]): The throughput reported by SQL Server, if any.
+        md5_checksum (Optional[str]): The md5 checksum of the restored backup, if known.
+    """
+    history = read_drive_cache().get('restore_history', [])
+    history.append({
+        'name': name,
+        'md5Checksum': md5_checksum,
+        'restored_at': datetime.now().isoformat(),
+        'duration': round(duration, 3),
+        'mb_per_sec': mb_per_sec,
+    })
+    update_drive_cache({'restore_history': history[-RESTORE_HISTORY_LENGTH:]})
+
+
+def update_latest_restore(content: dict) -> None:
+    """
+    Updates the latest restore of the restore history of drive_cache.json, if any.
+
+    Args:
+        content (dict): The keys to update, e.g. what was built after the restore.
+    """
+    history = read_drive_cache().get('restore_history', [])
+    if not history:
+        return
+    history[-1].update(content)
+    update_drive_cache({'restore_history': history})
@@ -0,0 +1,66 @@
+import re
+from typing import NamedTuple, Optional
+
+from src.loggerfactory import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+# e.g. "[Microsoft][ODBC Driver 17 for SQL Server][SQL Server]10 percent processed."
+PERCENT_PROCESSED = re.compile(r"(\d+) percent processed")
+
+# e.g. "RESTORE DATABASE successfully processed 4178 pages in 0.517 seconds (63.118 MB/sec)."
+RESTORE_COMPLETED = re.compile(
+    r"successfully processed (\d+) pages in ([\d.]+) seconds \(([\d.]+) MB/sec\)")
+
+
+class RestoreStats(NamedTuple):
+    """
+    Represents the statistics SQL Server reports once a restore completes:
+    - pages: Number of pages restored
+    - seconds: Duration of the restore, in seconds
+    - mb_per_sec: Throughput of the restore, in MB/s
+    """
+
+    pages: int
+    seconds: float
+    mb_per_sec: float
+
+
+def strip_message_prefix(message: str) -> str:
+    """Removes the `[Microsoft][ODBC Driver ..][SQL Server]` prefix of a server message."""
+    return re.sub(r"^(\[[^\]]*\])+", "", message)
+
+
+def log_restore_messages(cursor) -> Optional[RestoreStats]:
+    """
+    Consumes the result sets of a `RESTORE ... WITH STATS` statement, logging the
+    messages SQL Server reports as they arrive. Progress and completion messages
+    are logged with their numbers as the `restore_percent` and `restore_stats`
+    attributes of the log records.
+
+    Args:
+        cursor: The pyodbc cursor which executed the restore.
+
+    Returns:
+        Optional[RestoreStats]: The statistics of the completed restore, if reported.
+    """
+    stats = None
+    while True:
+        for _, message in cursor.messages:
+            message = strip_message_prefix(message)
+            percent = PERCENT_PROCESSED.search(message)
+            completed = RESTORE_COMPLETED.search(message)
+            if percent:
+                logger.info(f"Restoring database... {percent.group(1)}%",
+                            extra={'restore_percent': int(percent.group(1))})
+            elif completed:
+                stats = RestoreStats(
+                    int(completed.group(1)), float(completed.group(2)), float(completed.group(3)))
+                logger.info(
+                    f"Restored {stats.pages} pages in {stats.seconds:.3f}s ({stats.mb_per_sec:.3f} MB/s)",
+                    extra={'restore_stats': stats._asdict()})
+            else:
+                logger.debug(message)
+        if not cursor.nextset():
+            return stats
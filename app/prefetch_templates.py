@@ -0,0 +1,32 @@
+import argparse
+
+from src.books import Books
+from src.cbms import CBMS, TokenAuth
+from src.taxpayerportal import TaxPayerPortal
+from src.template_file import TemplateFile
+
+
+def prefetch_templates(refresh: bool = False) -> None:
+    """
+    Fills the local template cache for every book.
+
+    Args:
+        refresh (bool): Download the templates even if they are cached.
+    """
+    for book in Books:
+        if book is Books.ONE_LAKH_PLUS:
+            template_file = TemplateFile(TaxPayerPortal(), None)
+        else:
+            template_file = TemplateFile(CBMS(), TokenAuth())
+        template_file.get(book.value, refresh=refresh)
+        print(f"{book.value.name} template is cached")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Prefetch the CBMS and TaxPayer Portal templates into the local cache.")
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="download the templates even if a valid copy is cached")
+    args = parser.parse_args()
+    prefetch_templates(refresh=args.refresh)
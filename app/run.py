@@ -1,35 +1,101 @@
-import json
+import time
+from typing import TYPE_CHECKING
 from nepali_datetime import datetime as np_datetime
-from drive_database.credential_handler import get_cached_credentials
-from drive_database.database_operations import restore
-from settings import DRIVE_CACHE_PATH, TOKEN_PATH
-from drive_database.drive import GoogleDriveFile, download_drive_file, retrive_latest_file_by_pattern
+from settings import BACKUP_FRESHNESS_WINDOW, FAST_START, TOKEN_PATH
+from src.configurations import load_config
 from src.date_helpers import get_month_name_np, get_previous_month_and_year
 from src.filingmonth import FilingMonth
 from src.menu import Menu, MenuOption, ReportMenu
 from src.nepalidateselector import NepaliDateSelector
-from src.report_generator import ReportGenerator
 
+# Heavy modules (pandas, openpyxl, the Google API clients and pyodbc) are
+# imported on the code paths which need them, so that the menu shows up fast.
+if TYPE_CHECKING:
+    from drive_database.drive import GoogleDriveFile
 
-def perform_restore(file: GoogleDriveFile, creds) -> None:
-    if DRIVE_CACHE_PATH.exists():
-        with DRIVE_CACHE_PATH.open('r') as f:
-            info: dict = json.load(f)
-        if info['name'] == file['name']:
+
+FILE_PATTERN = r"VatBillingSoftware_\d+_\d+\.bak"
+
+
+def perform_restore(file: "GoogleDriveFile", creds) -> bool:
+    """
+    Restores the database from the drive file unless it was restored from it already,
+    asking first if it was restored from another backup.
+
+    Returns:
+        bool: Whether the database is restored from the drive file.
+    """
+    from drive_database.database_operations import restore
+    from drive_database.drive import download_drive_file
+    from drive_database.drive_cache import read_drive_cache
+
+    # drive_cache.json names the backup at download time, the restore history only once restored
+    restore_history = read_drive_cache().get('restore_history')
+    if restore_history:
+        latest_restore: dict = restore_history[-1]
+        # A backup uploaded again under the same name differs in its checksum
+        restored_checksum = latest_restore.get('md5Checksum')
+        latest_checksum = file.get('md5Checksum')
+        same_checksum = None in (restored_checksum, latest_checksum) or restored_checksum == latest_checksum
+        if latest_restore['name'] == file['name'] and same_checksum:
             print("Database already restored from the latest backup!")
-            return None
+            return True
         else:
             print(
-                f"Database was restored from another backup on {info['datetime']}")
-            print(f"Current backup: {info['name']}")
+                f"Database was restored from another backup on {latest_restore['restored_at']}")
+            print(f"Current backup: {latest_restore['name']}")
             print(f"Latest backup: {file['name']}")
             choice = input("Do you want to restore latest backup? [y/N] ")
             if choice.lower() != 'y':
-                return None
+                return False
             print("Database will be restored from the latest backup!")
 
     filepath = download_drive_file(creds, file)
-    restore(filepath)
+    return restore(filepath)
+
+
+def is_restore_fresh() -> bool:
+    """
+    Checks whether Google Drive was checked for a newer backup within BACKUP_FRESHNESS_WINDOW
+    and the restore history of the database shows the backup found by that check.
+    """
+    from drive_database.drive_cache import read_drive_cache
+
+    cache = read_drive_cache()
+    checked_at = cache.get('checked_at')
+    if checked_at is None or time.time() - checked_at > BACKUP_FRESHNESS_WINDOW:
+        return False
+
+    from drive_database.database_operations import get_restored_backup_name
+    return get_restored_backup_name() == cache.get('name')
+
+
+def sync_latest_backup(file_pattern: str = FILE_PATTERN, fast_start: bool = FAST_START) -> None:
+    """
+    Restores the database from the latest backup on Google Drive, if needed.
+
+    With fast_start, Google Drive is not checked again while the last check is
+    fresh and the database was restored from the backup it found.
+    """
+    if fast_start and is_restore_fresh():
+        print("Database was restored from the latest backup, skipping the Google Drive check.")
+        return None
+
+    from drive_database.credential_handler import get_cached_credentials
+    from drive_database.drive import retrive_latest_file_by_pattern
+    from drive_database.drive_cache import update_drive_cache
+
+    # Check if token file exists
+    if TOKEN_PATH.exists():
+        creds = get_cached_credentials()
+    else:
+        raise FileNotFoundError(f'Token file not found: {TOKEN_PATH}')
+
+    latest_file = retrive_latest_file_by_pattern(creds, file_pattern)
+
+    # A declined or failed restore is offered again on the next start
+    if latest_file is not None and perform_restore(latest_file, creds):
+        update_drive_cache({'checked_at': time.time()})
 
 
 def get_month_report(**kwargs) -> None:
@@ -42,6 +108,8 @@ def get_month_report(**kwargs) -> None:
     Returns:
     None
     """
+    from src.report_generator import ReportGenerator
+
     # Extract month and year from kwargs
     month = kwargs.get("month")
     year = kwargs.get("year")
@@ -54,7 +122,8 @@ def get_month_report(**kwargs) -> None:
     book = report_menu.prompt_user_for_book()
 
     # Generate report using ReportGenerator
-    report_generator = ReportGenerator(filingMonth=filingmonth)
+    report_generator = ReportGenerator(
+        filingMonth=filingmonth, batch_fetch=True, concurrent=True)
     report_generator.generate(book)
 
 
@@ -75,21 +144,8 @@ def select_custom_date_range() -> None:
     raise NotImplementedError
 
 
-if __name__ == "__main__":
-
-    file_pattern = r"VatBillingSoftware_\d+_\d+\.bak"
-
-    # Check if token file exists
-    if TOKEN_PATH.exists():
-        creds = get_cached_credentials()
-    else:
-        raise FileNotFoundError(f'Token file not found: {TOKEN_PATH}')
-
-    latest_file = retrive_latest_file_by_pattern(creds, file_pattern)
-
-    if latest_file is not None:
-        perform_restore(latest_file, creds)
-
+def build_menu() -> Menu:
+    """Builds the main menu of the report generator."""
     now = np_datetime.now()
     current_month = now.month
     current_year = now.year
@@ -111,5 +167,18 @@ if __name__ == "__main__":
         )
     ]
 
-    menu = Menu("Report Generator", options)
+    return Menu("Report Generator", options)
+
+
+def main() -> None:
+    # Parse the runtime configurations once, up front
+    load_config()
+
+    sync_latest_backup()
+
+    menu = build_menu()
     menu.run()
+
+
+if __name__ == "__main__":
+    main()
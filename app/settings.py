@@ -8,12 +8,45 @@ PACKAGE_DIR = PACKAGE_PATH.parent
 GOOGLE_API_CREDENTIALS = PACKAGE_DIR.joinpath('client_secrets.json')
 TOKEN_PATH = PACKAGE_PATH / 'token.json'
 
+# CBMS login token cached with its expiry between runs
+CBMS_TOKEN_PATH = PACKAGE_PATH / 'cbms_token.json'
+
+# Lifetime assumed for a CBMS token which does not carry its own expiry (in seconds)
+CBMS_TOKEN_TTL = 60 * 60
+
 # Set the path to your client secrets JSON file
 DRIVE_CACHE_PATH = PACKAGE_PATH / 'drive_cache.json'
 
+# Prefix of the backup file names, filtered by Google Drive before the file pattern is matched
+DRIVE_BACKUP_PREFIX = 'VatBillingSoftware_'
+
+# Seconds for which the latest backup found on Google Drive is reused without listing again
+DRIVE_LISTING_TTL = 5 * 60
+
+# Opt in to skipping the Google Drive check at startup while the last one is within
+# BACKUP_FRESHNESS_WINDOW seconds and the database was restored from the backup it found
+FAST_START = False
+BACKUP_FRESHNESS_WINDOW = 6 * 60 * 60
+
+# Directory shared with the SQL Server container where backups are downloaded
+BACKUP_DIR = Path('/backup')
+
+# Number of bytes requested per chunk when downloading a backup from Google Drive
+DRIVE_DOWNLOAD_CHUNKSIZE = 32 * 1024 * 1024
+
+# Attempts to resume a download after a dropped connection or a transient
+# error (429 or 5xx) before giving up
+DRIVE_DOWNLOAD_RETRIES = 3
+
+# Seconds to wait before the first retry of a download, doubled on every next one
+DRIVE_DOWNLOAD_BACKOFF = 1
+
 # Define the default logging configuration file path
 DEFAULT_LOG_PATH = PACKAGE_PATH.joinpath('src', 'config', 'logger_config.yml')
 
+# Hand log records to a background thread which writes them to file and console
+LOG_QUEUE = False
+
 # Define the path to the runtime configuration file
 RUNTIME_CONFIG_PATH = PACKAGE_PATH.joinpath(
     'src', 'config', 'runtime_config.yml')
@@ -41,6 +74,29 @@ DOWNLOAD_REPORT_ID = {
 # Set the flag to determine whether to save the downloaded file locally
 DOWNLOAD = False
 
+# Number of rows read per chunk when querying transactions, None reads the whole month at once
+QUERY_CHUNKSIZE = None
+
+# Percentage steps at which SQL Server reports the progress of a restore
+RESTORE_STATS_PERCENT = 5
+
+# Materialize the report query into an indexed table after each restore and read the reports from it
+USE_REPORT_TABLE = False
+
+# Stream report rows through a write-only workbook to keep memory flat on large months.
+# Only the book sheet of the template is kept, with its header, print settings and freeze panes
+XLSX_WRITE_ONLY = False
+
 # Define the directories for template files and sheets
 TEMPLATE_SAVE_DIR = PACKAGE_PATH / 'templates'
 SHEETS_DIR = PACKAGE_PATH / 'sheets'
+
+# Templates validated against HASH_VALUE are cached here, named by their md5 hash
+TEMPLATE_CACHE_DIR = TEMPLATE_SAVE_DIR / 'cache'
+
+# Snapshot the queried transactions as Parquet, keyed by the restored backup, and read them back on later runs
+TRANSACTION_CACHE = True
+TRANSACTION_CACHE_DIR = SHEETS_DIR / '.cache'
+
+# Query only the rows changed since the snapshot of a previous backup and merge them into it
+INCREMENTAL_QUERY = False
@@ -1,7 +1,12 @@
+import base64
+import json
 import os
+import threading
+import time
 import requests
 from requests.auth import AuthBase
 from dotenv import load_dotenv
+from settings import CBMS_TOKEN_PATH, CBMS_TOKEN_TTL
 from src.customsession import CustomSession
 
 from src.loggerfactory import LoggerFactory
@@ -14,6 +19,9 @@ logger = LoggerFactory.get_logger(__name__)
 BASE_URL = 'https://cbms.ird.gov.np:8051'
 LOGIN_ENDPOINT = '/api/auth/login'
 
+# Seconds before its expiry from which a token is no longer used
+EXPIRY_MARGIN = 60
+
 
 class CBMS(CustomSession):
     """Custom session optimized to connect to the CBMS portal."""
@@ -29,25 +37,121 @@ class CBMS(CustomSession):
 
 
 class TokenAuth(AuthBase):
-    """Implements a token authentication scheme to work with the CBMS session."""
+    """
+    Implements a token authentication scheme to work with the CBMS session.
 
-    _TOKEN = None
+    The token is fetched lazily on the first request which needs it and cached
+    with its expiry in CBMS_TOKEN_PATH, so later runs within its validity skip
+    the login. A request rejected with 401 logs in again and is sent once more.
+    """
 
-    def __init__(self):
-        """Initializes the TokenAuth and fetches token from the CBMS if not already fetched."""
-        if TokenAuth._TOKEN is None:
-            logger.info("Fetching new token")
-            TokenAuth.__fetch_token()
+    _TOKEN = None
+    _EXPIRES_AT = None
+    _LOCK = threading.Lock()
 
     def __call__(self, request):
         """Attaches an API token to a custom auth header."""
-        request.headers['Authorization'] = TokenAuth._TOKEN
+        request.headers['Authorization'] = self.token
+        request.register_hook('response', self.handle_401)
         return request
 
+    @property
+    def token(self) -> str:
+        """The bearer token, logging in to the CBMS if no valid token is cached."""
+        # Reports built concurrently share a single login
+        with TokenAuth._LOCK:
+            if not TokenAuth.__is_valid() and not TokenAuth.__load_token():
+                logger.info("Fetching new token")
+                TokenAuth.__fetch_token()
+                TokenAuth.__save_token()
+            return TokenAuth._TOKEN
+
+    def handle_401(self, response: requests.Response, **kwargs) -> requests.Response:
+        """Logs in again and resends the request once if the token was rejected."""
+        if response.status_code != 401 or getattr(response.request, 'token_retried', False):
+            return response
+
+        logger.warning("CBMS rejected the token, logging in again")
+        rejected_token = response.request.headers.get('Authorization')
+        with TokenAuth._LOCK:
+            # A concurrent request may have logged in again already
+            if TokenAuth._TOKEN == rejected_token:
+                TokenAuth.reset_token()
+                CBMS_TOKEN_PATH.unlink(missing_ok=True)
+
+        # Release the connection before resending through the same adapter
+        response.content
+        response.close()
+
+        request = response.request.copy()
+        request.headers['Authorization'] = self.token
+        request.token_retried = True
+
+        retried = response.connection.send(request, **kwargs)
+        retried.history.append(response)
+        retried.request = request
+        return retried
+
     @classmethod
     def reset_token(cls):
         """Resets the class-level cached token to None."""
         cls._TOKEN = None
+        cls._EXPIRES_AT = None
+
+    @staticmethod
+    def __is_valid() -> bool:
+        """Whether the class-level token exists and is not about to expire."""
+        return (
+            TokenAuth._TOKEN is not None
+            and TokenAuth._EXPIRES_AT is not None
+            and time.time() < TokenAuth._EXPIRES_AT - EXPIRY_MARGIN
+        )
+
+    @staticmethod
+    def __load_token() -> bool:
+        """Loads a still valid token from the token cache file."""
+        if not CBMS_TOKEN_PATH.exists():
+            return False
+        try:
+            with CBMS_TOKEN_PATH.open('r') as f:
+                cached: dict = json.load(f)
+            TokenAuth._TOKEN = cached['token']
+            TokenAuth._EXPIRES_AT = cached['expires_at']
+        except (IOError, json.JSONDecodeError, KeyError) as e:
+            logger.error(f"Error reading the cached token: {e}")
+            TokenAuth.reset_token()
+            return False
+
+        if not TokenAuth.__is_valid():
+            logger.debug("Cached token has expired")
+            TokenAuth.reset_token()
+            return False
+        logger.debug("Using cached token")
+        return True
+
+    @staticmethod
+    def __save_token():
+        """Saves the class-level token with its expiry to the token cache file."""
+        try:
+            with CBMS_TOKEN_PATH.open('w') as f:
+                json.dump({
+                    'token': TokenAuth._TOKEN,
+                    'expires_at': TokenAuth._EXPIRES_AT,
+                }, f)
+            CBMS_TOKEN_PATH.chmod(0o600)
+        except IOError as e:
+            logger.error(f"Error caching the token: {e}")
+
+    @staticmethod
+    def __token_expiry(token: str) -> float:
+        """Returns the expiry of a JWT token, or CBMS_TOKEN_TTL from now if it has none."""
+        try:
+            payload = token.split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(
+                payload + '=' * (-len(payload) % 4)))
+            return float(claims['exp'])
+        except (IndexError, ValueError, TypeError, KeyError):
+            return time.time() + CBMS_TOKEN_TTL
 
     @staticmethod
     def __fetch_token():
@@ -74,5 +178,6 @@ class TokenAuth(AuthBase):
             user_name = response_data.get('userName')  # userNameText
             logger.info(
                 f"Successfully logged in to CBMS Portal as {user_name}")
-            TokenAuth._TOKEN = " ".join(
-                ('Bearer', response.json()['token']))
+            token = response.json()['token']
+            TokenAuth._TOKEN = " ".join(('Bearer', token))
+            TokenAuth._EXPIRES_AT = TokenAuth.__token_expiry(token)
@@ -1,29 +1,84 @@
+import json
+import threading
 import yaml
 from pathlib import Path
-from settings import RUNTIME_CONFIG_PATH
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+from settings import DRIVE_CACHE_PATH, RUNTIME_CONFIG_PATH, USE_REPORT_TABLE
 
 from src.loggerfactory import LoggerFactory
+from src.queries import select_into
 
 
 # Get the logger instance
 logger = LoggerFactory.get_logger(__name__)
 
+# Parsed configurations keyed by their path, along with the (mtime, size) they were parsed at
+_CONFIG_CACHE: Dict[Path, Tuple[Tuple[int, int], Mapping]] = {}
+_CONFIG_LOCK = threading.Lock()
 
-def get_data(key: str, config_path: Path = RUNTIME_CONFIG_PATH) -> dict:
+
+class IndexDefinition(NamedTuple):
     """
-    Get the data for a specific key from the configuration file.
+    Represents an index provisioned on the restored database:
+    - table: Fully qualified name of the indexed table
+    - name: Name of the index
+    - columns: Key columns of the index
+    - include: Non-key columns covered by the index
+    """
+
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    include: Tuple[str, ...] = ()
+
+
+class CompanyDetails(NamedTuple):
+    """
+    Represents the company details printed on the reports:
+    - pan: PAN number of the company
+    - office_name: Name of the company
+    """
+
+    pan: str
+    office_name: str
+
+
+def _freeze(value: Any) -> Any:
+    """Returns a read-only view of the parsed YAML value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def load_config(config_path: Path = RUNTIME_CONFIG_PATH) -> Mapping:
+    """
+    Load the configuration file, parsing it only if it changed since it was last loaded.
 
     Args:
-    key (str): The key to retrieve the data for.
     config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
 
     Returns:
-    dict: The data for the specified key.
+    Mapping: A read-only view of the configurations.
 
     Raises:
     FileNotFoundError: If the configuration file is not found.
     """
-    if config_path.exists():
+    if not config_path.exists():
+        # Log error if the configuration file is not found
+        error_msg = f"File {config_path} not found"
+        logger.error(error_msg)
+        raise FileNotFoundError(error_msg)
+
+    stat = config_path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _CONFIG_LOCK:
+        cached = _CONFIG_CACHE.get(config_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
         with open(config_path, 'rt') as config_file:
             try:
                 config_data: dict = yaml.safe_load(config_file.read())
@@ -32,15 +87,140 @@ def get_data(key: str, config_path: Path = RUNTIME_CONFIG_PATH) -> dict:
                 logger.error(
                     f"Error loading {config_path.name} configurations: {err}")
                 raise SystemExit
-            try:
-                return config_data[key]
-            except KeyError:
-                # Log error if the key is not found in the configuration
-                logger.error(
-                    f"{key} not found in {config_path.name} configurations")
-                raise SystemExit
-    else:
-        # Log error if the configuration file is not found
-        error_msg = f"File {config_path} not found"
-        logger.error(error_msg)
-        raise FileNotFoundError(error_msg)
+
+        logger.debug(f"Loaded {config_path.name} configurations")
+        config = _freeze(config_data)
+        _CONFIG_CACHE[config_path] = (version, config)
+        return config
+
+
+def clear_cache() -> None:
+    """Forget the loaded configurations, so the next access parses them again."""
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE.clear()
+
+
+def get_data(key: str, config_path: Path = RUNTIME_CONFIG_PATH) -> Any:
+    """
+    Get the data for a specific key from the configuration file.
+
+    Args:
+    key (str): The key to retrieve the data for.
+    config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
+
+    Returns:
+    Any: A read-only view of the data for the specified key.
+
+    Raises:
+    FileNotFoundError: If the configuration file is not found.
+    """
+    config_data = load_config(config_path)
+    try:
+        return config_data[key]
+    except KeyError:
+        # Log error if the key is not found in the configuration
+        logger.error(
+            f"{key} not found in {config_path.name} configurations")
+        raise SystemExit
+
+
+def use_report_table() -> bool:
+    """
+    Whether the reports read the materialized report table, i.e. USE_REPORT_TABLE
+    is set and the latest restore recorded in drive_cache.json materialized it.
+    The table is only built by a restore, so until then the reports keep joining
+    the billing tables.
+    """
+    if not USE_REPORT_TABLE:
+        return False
+    try:
+        with DRIVE_CACHE_PATH.open('r', encoding='utf-8') as f:
+            latest_restore: dict = json.load(f)['restore_history'][-1]
+        return latest_restore.get('report_table', False) is True
+    except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+        return False
+
+
+def get_sql(config_path: Path = RUNTIME_CONFIG_PATH, materialized: Optional[bool] = None) -> str:
+    """
+    Get the report query from the configuration file.
+
+    Args:
+    config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
+    materialized (Optional[bool]): Read from the materialized report table instead of
+        joining the billing tables. Defaults to use_report_table().
+
+    Returns:
+    str: The SQL query of the reports.
+    """
+    if materialized is None:
+        materialized = use_report_table()
+    if materialized:
+        return get_data('report_table', config_path)['sql']
+    return get_data('sql', config_path)
+
+
+def get_delta_filter(config_path: Path = RUNTIME_CONFIG_PATH, materialized: Optional[bool] = None) -> str:
+    """
+    Get the condition selecting the rows of the report query changed since a snapshot.
+
+    Args:
+    config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
+    materialized (Optional[bool]): Filter the materialized report table instead of
+        the billing tables. Defaults to use_report_table().
+
+    Returns:
+    str: The delta condition, binding the highest transaction id and latest bill date.
+    """
+    if materialized is None:
+        materialized = use_report_table()
+    if materialized:
+        return get_data('report_table', config_path)['delta_filter']
+    return get_data('delta_filter', config_path)
+
+
+def get_report_table_sql(config_path: Path = RUNTIME_CONFIG_PATH) -> str:
+    """
+    Get the statements materializing the report query into the report table,
+    built from the report query itself so that both always select the same columns.
+
+    Args:
+    config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
+
+    Returns:
+    str: The SQL statements (re)creating the report table and its index.
+    """
+    report_table = get_data('report_table', config_path)
+    table = report_table['name']
+    return "\n".join([
+        f"DROP TABLE IF EXISTS {table};",
+        select_into(get_sql(config_path, materialized=False), table),
+        report_table['index'],
+    ])
+
+
+def get_company_details(config_path: Path = RUNTIME_CONFIG_PATH) -> CompanyDetails:
+    """
+    Get the company details from the configuration file.
+
+    Args:
+    config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
+
+    Returns:
+    CompanyDetails: The company details printed on the reports.
+    """
+    details = get_data('details', config_path)
+    return CompanyDetails(str(details['PAN']), details['office_name'])
+
+
+def get_indexes(config_path: Path = RUNTIME_CONFIG_PATH) -> Tuple[IndexDefinition, ...]:
+    """
+    Get the indexes to provision on the restored database from the configuration file.
+
+    Args:
+    config_path (Path): The path to the configuration file. Defaults to RUNTIME_CONFIG_PATH.
+
+    Returns:
+    Tuple[IndexDefinition, ...]: The index definitions.
+    """
+    return tuple(IndexDefinition(**index) for index in get_data('indexes', config_path))
@@ -1,4 +1,7 @@
+import threading
+from time import perf_counter
 from sqlalchemy import URL, create_engine
+from sqlalchemy.pool import QueuePool
 import tomli
 import os
 from settings import DB_CONFIGURATION_PATH
@@ -6,8 +9,28 @@ from settings import DB_CONFIGURATION_PATH
 from src.loggerfactory import LoggerFactory
 
 
+# Engine options used when db_config.toml has no [engine] section
+DEFAULT_ENGINE_OPTIONS = {
+    'pool_pre_ping': True,
+}
+
+
+class TimedQueuePool(QueuePool):
+    """Queue pool which logs how long it takes to acquire a connection."""
+
+    logger = LoggerFactory.get_logger(__name__)
+
+    def connect(self):
+        start = perf_counter()
+        connection = super().connect()
+        self.logger.debug(
+            f"Acquired database connection in {perf_counter() - start:.3f}s [{self.status()}]")
+        return connection
+
+
 class SQLEngine:
     _sql_engine = None
+    _LOCK = threading.Lock()
 
     logger = LoggerFactory.get_logger(__name__)
 
@@ -27,6 +50,8 @@ class SQLEngine:
         SERVER_NAME = config_data['server']['name']
         DATABASE_NAME = config_data['database']['name']
         USERNAME = config_data['user']['name']
+        ENGINE_OPTIONS = {**DEFAULT_ENGINE_OPTIONS, **config_data.get('engine', {})}
+        ODBC_OPTIONS = config_data.get('odbc', {})
 
         password = os.getenv('SA_PASSWORD')
         if not password:
@@ -36,16 +61,30 @@ class SQLEngine:
 
         # Construct the connection string
         connection_string = f"DRIVER={{{DRIVER_NAME}}};SERVER={SERVER_NAME};DATABASE={DATABASE_NAME};UID={USERNAME};PWD={password}"
+        for option, value in ODBC_OPTIONS.items():
+            connection_string += f";{option}={value}"
         connection_url = URL.create(
             "mssql+pyodbc", query={"odbc_connect": connection_string})
-        return create_engine(connection_url)
+        return create_engine(connection_url, poolclass=TimedQueuePool, **ENGINE_OPTIONS)
     
     @classmethod
     def get(cls):
-        if cls._sql_engine is None:
-            cls._sql_engine = cls._get_sql_engine()
-        return cls._sql_engine
+        # Reports built concurrently share a single engine and its pool
+        with cls._LOCK:
+            if cls._sql_engine is None:
+                cls._sql_engine = cls._get_sql_engine()
+            return cls._sql_engine
     
     @classmethod
     def reset(cls):
-        cls._sql_engine = None
+        with cls._LOCK:
+            cls._sql_engine = None
+
+    @classmethod
+    def dispose(cls):
+        """Close all pooled connections, e.g. after the database was restored, and drop the engine."""
+        with cls._LOCK:
+            engine, cls._sql_engine = cls._sql_engine, None
+        if engine is not None:
+            cls.logger.debug('Disposing the SQL engine connection pool')
+            engine.dispose()
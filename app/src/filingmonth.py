@@ -1,4 +1,5 @@
 from datetime import date
+from typing import List, Optional, Tuple
 
 import nepali_datetime
 from pyBSDate import bsdate
@@ -8,6 +9,10 @@ from src.date_helpers import get_month_name_np
 from src.date_range import ADDateRange, BSDateRange
 
 
+# Nepali months in the order of a fiscal year, from Shrawan to Ashadh
+FISCAL_YEAR_MONTHS = (4, 5, 6, 7, 8, 9, 10, 11, 12, 1, 2, 3)
+
+
 class FilingMonth:
     """
     FilingMonth represents the nepali month for which VAT reports
@@ -27,6 +32,32 @@ class FilingMonth:
         # self.bs_date_range = self.get_BS_date_range()
         # self.ad_date_range = self.get_AD_date_range(self.bs_date_range)
 
+    @classmethod
+    def from_fiscal_year(cls, year: int, months: Optional[Tuple[int, int]] = None) -> List["FilingMonth"]:
+        """
+        Returns the filing months of the fiscal year starting in the given year,
+        e.g. 2080 for 2080/81, in fiscal order.
+
+        Args:
+            year (int): The year, according to Nepali Calander, in which the fiscal year starts.
+            months (Optional[Tuple[int, int]]): The first and last month to include, in fiscal
+                order, e.g. (10, 2) for Magh to Jestha. Defaults to the whole fiscal year.
+
+        Raises:
+            ValueError: If a month is not between 1 and 12.
+        """
+        first, last = months or (FISCAL_YEAR_MONTHS[0], FISCAL_YEAR_MONTHS[-1])
+        if not (first in FISCAL_YEAR_MONTHS and last in FISCAL_YEAR_MONTHS):
+            raise ValueError("Months must be between 1 and 12")
+        start = FISCAL_YEAR_MONTHS.index(first)
+        end = FISCAL_YEAR_MONTHS.index(last)
+        if start > end:
+            raise ValueError(f"Month {first} comes after month {last} in the fiscal year")
+        return [
+            cls(year if month >= FISCAL_YEAR_MONTHS[0] else year + 1, month)
+            for month in FISCAL_YEAR_MONTHS[start:end + 1]
+        ]
+
     @staticmethod
     def __convert_BS_to_AD(bs_date: bsdate):
         """It is a conversion funcion to convert the BS date to standard AD date"""
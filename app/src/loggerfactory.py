@@ -1,9 +1,14 @@
+import atexit
 import logging
 import logging.config
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
 import yaml
 from pathlib import Path
 
-from settings import DEFAULT_LOG_PATH
+from settings import DEFAULT_LOG_PATH, LOG_QUEUE
 
 
 DEFAULT_LOG_LEVEL = logging.DEBUG
@@ -12,14 +17,21 @@ DEFAULT_LOG_LEVEL = logging.DEBUG
 class LoggerFactory(object):
     """
     Reusable logger.
+
+    Logging is configured once per process (and again only if another
+    configuration file is requested), after which named loggers are
+    served from a cache.
     """
 
-    _LOG = None
+    _CFG_PATH: Optional[Path] = None
+    _LOGGERS: Dict[str, logging.Logger] = {}
+    _LISTENER: Optional[QueueListener] = None
+    _LOCK = threading.Lock()
 
     @staticmethod
-    def __createlogger(name: str, cfg_path: Path):
+    def __configure(cfg_path: Path):
         """
-        A private method that interacts with the python logging module.
+        A private method that configures the python logging module from the yaml file.
         """
         if cfg_path.exists():
             with open(cfg_path, 'rt') as cfg_file:
@@ -33,9 +45,47 @@ class LoggerFactory(object):
         else:
             raise FileNotFoundError("Logging configuration not found")
 
-        LoggerFactory._LOG = logging.getLogger(name)
+        if LOG_QUEUE:
+            LoggerFactory.__start_queue()
+
+    @staticmethod
+    def __start_queue():
+        """
+        A private method that moves the root handlers behind a queue, so that
+        records are written to file and console off the logging thread.
+        """
+        root = logging.getLogger()
+        listener = QueueListener(
+            queue.SimpleQueue(), *root.handlers, respect_handler_level=True)
+        root.handlers = [QueueHandler(listener.queue)]
+        listener.start()
+        LoggerFactory._LISTENER = listener
 
-        return LoggerFactory._LOG
+    @staticmethod
+    def stop_queue():
+        """
+        Flushes the queued records and stops the queue listener, if any.
+        """
+        if LoggerFactory._LISTENER is not None:
+            LoggerFactory._LISTENER.stop()
+            LoggerFactory._LISTENER = None
+
+    @staticmethod
+    def __createlogger(name: str, cfg_path: Path):
+        """
+        A private method that interacts with the python logging module.
+        """
+        with LoggerFactory._LOCK:
+            if LoggerFactory._CFG_PATH != cfg_path:
+                LoggerFactory.stop_queue()
+                LoggerFactory.__configure(cfg_path)
+                LoggerFactory._CFG_PATH = cfg_path
+                LoggerFactory._LOGGERS = {}
+
+            if name not in LoggerFactory._LOGGERS:
+                LoggerFactory._LOGGERS[name] = logging.getLogger(name)
+            # Returned under the lock, as concurrent calls share the cache
+            return LoggerFactory._LOGGERS[name]
 
     @staticmethod
     def get_logger(
@@ -55,3 +105,6 @@ class LoggerFactory(object):
 
         # return the logger
         return logger
+
+
+atexit.register(LoggerFactory.stop_queue)
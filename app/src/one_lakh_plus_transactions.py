@@ -26,12 +26,56 @@ class TransactionAbove1L(NamedTuple):
     exempted_amount: int
 
 
+def aggregate_transactions_above_1L(transactions: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """
+    Aggregate transactions based on PAN Value and return those with 'Grand Total'
+    above 1 lakh as a frame with the fields of TransactionAbove1L as columns.
+
+    Args:
+        transactions (pd.DataFrame): The processed transactions of a book.
+        symbol (str): The symbol of the book, used as the transaction type.
+
+    Returns:
+        pd.DataFrame: One row per PAN with:
+        - Vat Pan No
+        - Bill Receiveable Person
+        - 'E' as the trade name type
+        - Book symbol
+        - Taxable Amount
+        - 0 as the exempted amount
+    """
+    # Filter transactions with a valid 'Vat Pan No' (non-empty strings)
+    transactions_PAN = transactions[transactions['Vat Pan No'].astype(bool)]
+
+    # Group transactions by 'Vat Pan No' and aggregate relevant information
+    transactions_PAN = transactions_PAN.groupby('Vat Pan No').agg({
+        'Bill Receiveable Person': 'first',  # Keep the first 'Bill Receiveable Person'
+        'Taxable Amount': 'sum',  # Sum the 'Taxable Amount' for each PAN
+        'Grand Total': 'sum',  # Sum the 'Grand Total' for each PAN
+    }).reset_index()
+
+    # Filter transactions where 'Grand Total' is above 1,00,000
+    transactions_PAN = transactions_PAN[
+        transactions_PAN['Grand Total'].gt(1_00_000)
+    ].reset_index(drop=True)
+
+    return pd.DataFrame({
+        'pan_no': transactions_PAN['Vat Pan No'],
+        'bill_receiveable_person': transactions_PAN['Bill Receiveable Person'],
+        'trade_name_type': 'E',
+        'transaction_type': symbol,
+        'taxable_amount': transactions_PAN['Taxable Amount'],
+        'exempted_amount': 0,
+    }, columns=list(TransactionAbove1L._fields))
+
+
 class LakhBusters:
     """
     Class to manage transactions above 1L and generate reports.
     """
 
     _lakh_busters: List[TransactionAbove1L] = []
+    _lakh_buster_frames: List[pd.DataFrame] = []
 
     def __init__(self, work_dir: Path):
         """
@@ -62,7 +106,15 @@ class LakhBusters:
         Write the buffer to lakh_buster's filepath
         """
         headers = pd.read_excel(self.buffer).columns
-        df_1L = pd.DataFrame(LakhBusters._lakh_busters, columns=headers)
+        frames = list(LakhBusters._lakh_buster_frames)
+        if LakhBusters._lakh_busters:
+            frames.append(pd.DataFrame(
+                LakhBusters._lakh_busters, columns=TransactionAbove1L._fields))
+        if frames:
+            df_1L = pd.concat(frames, ignore_index=True)
+        else:
+            df_1L = pd.DataFrame(columns=TransactionAbove1L._fields)
+        df_1L = df_1L.set_axis(headers, axis=1)
         df_1L.to_excel(self.save_filepath, index=False)
 
     @classmethod
@@ -79,9 +131,18 @@ class LakhBusters:
         """
         cls._lakh_busters.extend(new_lakh_busters)
 
+    @classmethod
+    def update_lakh_busters_frame(cls, new_lakh_busters: pd.DataFrame):
+        """
+        Update the lakh busters with a frame of new lakh busters, as returned by
+        aggregate_transactions_above_1L.
+        """
+        cls._lakh_buster_frames.append(new_lakh_busters)
+
     @classmethod
     def reset_busters(cls):
         """
         Reset the list of lakh busters.
         """
         cls._lakh_busters = []
+        cls._lakh_buster_frames = []
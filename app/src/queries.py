@@ -0,0 +1,119 @@
+import re
+from typing import Sequence
+
+
+# Matches the single book filter of the report queries, e.g.
+# `SystemTransaction.[Transaction Type] = ?`
+TRANSACTION_TYPE_FILTER = re.compile(r"((?:\w+\.)?\[Transaction Type\])\s*=\s*\?")
+
+# Matches the date range filter of the report queries, e.g.
+# `SystemTransaction.[Bill Date] BETWEEN ? AND ?`
+BILL_DATE_FILTER = re.compile(r"((?:\w+\.)?\[Bill Date\]\s+BETWEEN\s+\?\s+AND\s+\?)")
+
+# Matches the FROM clause of the outermost query, which starts a line
+FROM_CLAUSE = re.compile(r"^([ \t]*)FROM\b", re.MULTILINE)
+
+# Matches the trailing ORDER BY clause of a query
+ORDER_BY_CLAUSE = re.compile(r"\s*\bORDER\s+BY\b[^;()]*;?\s*$")
+
+
+def filter_transaction_types(sql_query: str, count: int) -> str:
+    """
+    Rewrites the single book filter of a report query to match several books
+    in one round trip, e.g. `[Transaction Type] = ?` to `[Transaction Type] IN (?, ?)`.
+
+    Args:
+        sql_query (str): The report query filtering on a single transaction type.
+        count (int): The number of transaction types to bind.
+
+    Returns:
+        str: The query filtering on `count` transaction types.
+
+    Raises:
+        ValueError: If the query has no single transaction type filter.
+    """
+    placeholders = ", ".join("?" * count)
+    batch_query, replaced = TRANSACTION_TYPE_FILTER.subn(
+        rf"\1 IN ({placeholders})", sql_query)
+    if replaced != 1:
+        raise ValueError(
+            "Expected exactly one [Transaction Type] = ? filter in the query")
+    return batch_query
+
+
+def add_delta_filter(sql_query: str, delta_filter: str) -> str:
+    """
+    Narrows the date range filter of a report query with the delta filter,
+    e.g. `[Bill Date] BETWEEN ? AND ?` to `[Bill Date] BETWEEN ? AND ? AND (...)`,
+    so that its placeholders are bound after the date range.
+
+    Args:
+        sql_query (str): The report query filtering on a date range.
+        delta_filter (str): The condition selecting the changed rows.
+
+    Returns:
+        str: The query selecting the changed rows within the date range.
+
+    Raises:
+        ValueError: If the query has no single date range filter.
+    """
+    delta_query, replaced = BILL_DATE_FILTER.subn(
+        lambda match: f"{match.group(1)} AND ({delta_filter.strip()})", sql_query)
+    if replaced != 1:
+        raise ValueError(
+            "Expected exactly one [Bill Date] BETWEEN ? AND ? filter in the query")
+    return delta_query
+
+
+def select_into(sql_query: str, table: str) -> str:
+    """
+    Rewrites a report query to select the rows of all books and dates into a new table,
+    i.e. drops its book and date range filters and its ordering, and adds `INTO table`.
+
+    Args:
+        sql_query (str): The report query filtering on a single transaction type and a date range.
+        table (str): The fully qualified name of the table to create.
+
+    Returns:
+        str: The SELECT ... INTO statement, without placeholders.
+
+    Raises:
+        ValueError: If the query lacks either filter or a FROM clause starting a line.
+    """
+    query, types_replaced = TRANSACTION_TYPE_FILTER.subn("1 = 1", sql_query)
+    query, dates_replaced = BILL_DATE_FILTER.subn("1 = 1", query)
+    if (types_replaced, dates_replaced) != (1, 1):
+        raise ValueError(
+            "Expected exactly one [Transaction Type] = ? and one [Bill Date] BETWEEN ? AND ? filter in the query")
+    query = ORDER_BY_CLAUSE.sub("", query)
+    query, replaced = FROM_CLAUSE.subn(
+        lambda match: f"{match.group(1)}INTO {table}\n{match.group(0)}", query, count=1)
+    if replaced != 1:
+        raise ValueError("Expected a FROM clause starting a line in the query")
+    return query + ";"
+
+
+def create_index_if_missing(table: str, name: str, columns: Sequence[str], include: Sequence[str] = ()) -> str:
+    """
+    Builds a statement creating a nonclustered index unless one with the same
+    name already exists on the table.
+
+    Args:
+        table (str): The fully qualified table name, e.g. `[db].[dbo].[table]`.
+        name (str): The name of the index.
+        columns (Sequence[str]): The key columns of the index.
+        include (Sequence[str]): The non-key columns covered by the index.
+
+    Returns:
+        str: The T-SQL statement.
+    """
+    database = table.split('.')[0] if table.count('.') == 2 else None
+    sys_indexes = f"{database}.sys.indexes" if database else "sys.indexes"
+    statement = (
+        f"IF NOT EXISTS (SELECT 1 FROM {sys_indexes} "
+        f"WHERE name = '{name}' AND object_id = OBJECT_ID('{table}'))\n"
+        f"    CREATE NONCLUSTERED INDEX [{name}] ON {table} ({', '.join(columns)})"
+    )
+    if include:
+        statement += f" INCLUDE ({', '.join(include)})"
+    return statement + ";"
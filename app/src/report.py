@@ -1,25 +1,180 @@
+from copy import copy
 from io import BytesIO
 from pathlib import Path
-from typing import List
-from openpyxl import load_workbook
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.worksheet.worksheet import Worksheet
 import pandas as pd
+from settings import INCREMENTAL_QUERY, QUERY_CHUNKSIZE, TRANSACTION_CACHE, XLSX_WRITE_ONLY
 from src.books import Book
 from src.cbms import CBMS, TokenAuth
 
-from src.configurations import get_data
+from src.configurations import get_company_details, get_delta_filter, get_sql
 from src.db_connection import SQLEngine
 from src.file_handlers import write_bytes_to_disk
 from src.filingmonth import FilingMonth
 from src.loggerfactory import LoggerFactory
-from src.one_lakh_plus_transactions import TransactionAbove1L
+from src.one_lakh_plus_transactions import TransactionAbove1L, aggregate_transactions_above_1L
+from src.queries import add_delta_filter
 from src.template_file import TemplateFile
+from src.timing import timed
+from src.transaction_cache import TransactionCache
 
 
 logger = LoggerFactory.get_logger(__name__)
 
+# Status of a cancelled transaction in the billing software
+CANCELLED_STATUS = '001-03'
+
+# Amount columns which are dashed out for cancelled transactions
+AMOUNT_COLUMNS = ['Grand Total', 'Total w Round', 'Taxable Amount', 'Tax Amount']
+
+# Columns kept besides the book columns for the round off comparison
+ROUNDOFF_COLUMNS = ['Transaction ID', 'Grand Total', 'Total w Round', 'Round Off']
+
+# Columns kept besides the book columns for the snapshot watermark and the
+# split of batched queries per book and month
+SNAPSHOT_COLUMNS = ['Bill Date', 'Transaction Type']
+
+
+def normalize_pan(pans: pd.Series) -> pd.Series:
+    """
+    Converts PANs to integers, leaving missing (NULL, empty or zero) PANs as empty strings.
+
+    Args:
+        pans (pd.Series): The PANs as numbers or numeric strings.
+
+    Returns:
+        pd.Series: The PANs as integers, or as an object series of
+        Python ints and empty strings if any PAN is missing.
+    """
+    values = pans.to_numpy()
+    # NULL PANs must not be cast, as NaN turns into the smallest int64
+    missing = pd.isna(values)
+    if values.dtype == object:
+        missing |= values == ''
+    numbers = np.where(missing, 0, values).astype(np.int64)
+    zero = numbers == 0
+    if not zero.any():
+        return pd.Series(numbers, index=pans.index, name=pans.name)
+
+    values = numbers.astype(object)
+    values[zero] = ''
+    return pd.Series(values, index=pans.index, name=pans.name)
+
+
+def get_header_offset(sheet: Worksheet) -> int:
+    """
+    Returns the number of the last row holding a value, i.e. the rows taken by the template header.
+
+    Args:
+        sheet (Worksheet): The template sheet.
+    """
+    for row in range(sheet.max_row, 0, -1):
+        if any(cell.value is not None for cell in sheet[row]):
+            return row
+    return 0
+
+
+def iter_rows(dataframe: pd.DataFrame, chunksize: int = 10_000) -> Iterator[Tuple]:
+    """
+    Lazily yields the rows of the dataframe as tuples of Python scalars with
+    None in place of missing values, converting one chunk of rows at a time.
+
+    Args:
+        dataframe (pd.DataFrame): The rows to yield, without index and header.
+        chunksize (int): The number of rows converted at a time.
+    """
+    for start in range(0, len(dataframe), chunksize):
+        chunk = dataframe.iloc[start:start + chunksize]
+        values = chunk.astype(object).where(chunk.notna(), None)
+        yield from values.itertuples(index=False, name=None)
+
+
+def write_rows(sheet: Worksheet, dataframe: pd.DataFrame, start_row: int) -> None:
+    """
+    Writes the values of the dataframe into the sheet from the start row on,
+    leaving the cells of missing values empty.
+
+    Args:
+        sheet (Worksheet): The sheet to write into.
+        dataframe (pd.DataFrame): The rows to write, without index and header.
+        start_row (int): The sheet row of the first dataframe row.
+    """
+    for row_index, row in enumerate(iter_rows(dataframe), start=start_row):
+        for column_index, value in enumerate(row, start=1):
+            if value is not None:
+                sheet.cell(row=row_index, column=column_index, value=value)
+
+
+def copy_template_header(source: Worksheet, target: WriteOnlyWorksheet) -> None:
+    """
+    Copies the header rows of the template sheet, with their styles, column widths,
+    row heights and merged cells, into a write-only sheet, along with its freeze
+    panes, print settings, data validations and conditional formatting.
+
+    A write-only workbook holds this sheet only, so the other template sheets are
+    not kept, nor are the images, charts, comments and defined names of this one.
+
+    Args:
+        source (Worksheet): The loaded template sheet.
+        target (WriteOnlyWorksheet): The empty write-only sheet.
+    """
+    target.freeze_panes = source.freeze_panes
+    target.sheet_properties = copy(source.sheet_properties)
+    target.page_setup = copy(source.page_setup)
+    target.page_setup._parent = target
+    target.print_options = copy(source.print_options)
+    target.page_margins = copy(source.page_margins)
+    target.HeaderFooter = copy(source.HeaderFooter)
+    if source.print_title_rows:
+        target.print_title_rows = source.print_title_rows
+    if source.print_title_cols:
+        target.print_title_cols = source.print_title_cols
+    if source.print_area:
+        target.print_area = source.print_area
+    target.data_validations = copy(source.data_validations)
+    for conditional_format in source.conditional_formatting:
+        for rule in conditional_format.rules:
+            target.conditional_formatting.add(str(conditional_format.sqref), rule)
+
+    # Dimensions must be set before the first row is written
+    for key, dimension in source.column_dimensions.items():
+        target.column_dimensions[key].width = dimension.width
+    for key, dimension in source.row_dimensions.items():
+        target.row_dimensions[key].height = dimension.height
+    for merged_range in source.merged_cells.ranges:
+        target.merged_cells.add(copy(merged_range))
+
+    for row in source.iter_rows(max_row=get_header_offset(source)):
+        header_row = []
+        for cell in row:
+            header_cell = WriteOnlyCell(target, value=cell.value)
+            if cell.has_style:
+                header_cell.font = copy(cell.font)
+                header_cell.border = copy(cell.border)
+                header_cell.fill = copy(cell.fill)
+                header_cell.number_format = cell.number_format
+                header_cell.protection = copy(cell.protection)
+                header_cell.alignment = copy(cell.alignment)
+            header_row.append(header_cell)
+        target.append(header_row)
+
 
 class Report:
-    def __init__(self, book: Book, filing_month: FilingMonth, work_dir: Path):
+    def __init__(
+        self,
+        book: Book,
+        filing_month: FilingMonth,
+        work_dir: Path,
+        chunksize: Optional[int] = QUERY_CHUNKSIZE,
+        write_only: bool = XLSX_WRITE_ONLY,
+        use_cache: bool = TRANSACTION_CACHE,
+        incremental: bool = INCREMENTAL_QUERY,
+    ):
         """
         Initialize the object with the provided book, filing month, and work directory.
 
@@ -27,8 +182,22 @@ class Report:
             book (Book): The book to be initialized with.
             filing_month (FilingMonth): The filing month to be initialized with.
             work_dir (Path): The work directory to be initialized with.
+            chunksize (Optional[int]): Number of rows to stream per query chunk.
+                None loads the whole month in a single read.
+            write_only (bool): Stream the rows through a write-only workbook,
+                so that memory stays flat regardless of the number of rows.
+                It keeps the book sheet of the template only, see copy_template_header.
+            use_cache (bool): Read the transactions from the snapshot of the
+                restored backup if there is one, and snapshot them otherwise.
+            incremental (bool): Without a snapshot of the restored backup, query only
+                the rows changed since the snapshot of a previous backup and merge them into it.
         """
         self.book = book
+        self.chunksize = chunksize
+        self.write_only = write_only
+        self.cache = TransactionCache.for_current_backup(
+            get_sql(), self.get_projected_columns() if chunksize else None) if use_cache else None
+        self.incremental = incremental
 
         self.filing_month = filing_month
         self.filing_month_name = self.filing_month.nepali_month_name()
@@ -38,6 +207,7 @@ class Report:
 
         self.cancelled_transactions = []
         self.buffer = BytesIO()
+        self.timings: Dict[str, float] = {}
 
         self._raw_transactions = None
         self._transactions = None
@@ -45,13 +215,16 @@ class Report:
     @property
     def raw_transactions(self) -> pd.DataFrame:
         """
-        Property to lazily load raw transactions from the database.
+        Property to lazily load raw transactions from the snapshot cache or the database.
 
         Returns:
         pd.DataFrame: The raw transactions data.
         """
         if self._raw_transactions is None:
-            self._raw_transactions = self.query_db()
+            with timed(self.timings, 'query'):
+                if not (self.read_cached_transactions() or self.load_incremental_transactions()):
+                    self._raw_transactions = self.query_db()
+                    self.write_cached_transactions()
         return self._raw_transactions
 
     @property
@@ -66,6 +239,90 @@ class Report:
             self._transactions = self.process_transactions()
         return self._transactions
 
+    def read_cached_transactions(self) -> bool:
+        """
+        Loads the raw transactions and their cancelled transactions from the snapshot cache.
+
+        Returns:
+        bool: Whether a snapshot was found.
+        """
+        if self.cache is None:
+            return False
+        snapshot = self.cache.read(self.book.id, self.date_range)
+        if snapshot is None:
+            return False
+        self._raw_transactions = snapshot.transactions
+        self.cancelled_transactions = list(snapshot.cancelled_transactions)
+        self._transactions = None
+        logger.info(f"Loaded {self.book.name} transactions from the snapshot cache")
+        return True
+
+    def load_incremental_transactions(self) -> bool:
+        """
+        Queries only the rows changed since the snapshot of a previous backup,
+        i.e. newer, cancelled or modified rows, merges them into that snapshot
+        and snapshots the result for the restored backup.
+
+        Returns:
+        bool: Whether the transactions were loaded incrementally.
+        """
+        if not self.incremental or self.cache is None:
+            return False
+        snapshot = self.cache.read_previous(self.book.id, self.date_range)
+        if snapshot is None or snapshot.watermark is None:
+            return False
+
+        sql_query = add_delta_filter(get_sql(), get_delta_filter())
+        params = (
+            self.book.id,
+            self.date_range.start,
+            self.date_range.end,
+            snapshot.watermark.transaction_id,
+            snapshot.watermark.bill_date,
+        )
+        logger.info(
+            f"Querying {self.book.name} transactions changed since transaction "
+            f"{snapshot.watermark.transaction_id} of {snapshot.watermark.bill_date:%Y-%m-%d}...")
+        delta = pd.read_sql(sql_query, SQLEngine.get(), params=params)
+
+        self.cancelled_transactions = list(snapshot.cancelled_transactions)
+        self._raw_transactions = self.merge_delta(snapshot.transactions, delta)
+        self._transactions = None
+        self.write_cached_transactions()
+        return True
+
+    def merge_delta(self, transactions: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+        """
+        Replaces the transactions present in the delta by their queried rows and
+        appends the new ones, dropping the cancelled ones.
+
+        Args:
+            transactions (pd.DataFrame): The transactions of a snapshot.
+            delta (pd.DataFrame): The changed rows, as returned by the report query.
+
+        Returns:
+            pd.DataFrame: The up to date transactions, in bill date order.
+        """
+        changed = transactions['Transaction ID'].isin(delta['Transaction ID'])
+        delta = self.remove_cancelled_transactions(delta)
+        # Cancelled rows are queried again on every delta
+        self.cancelled_transactions = list(dict.fromkeys(self.cancelled_transactions))
+        logger.debug(
+            f"Merging {len(delta)} changed {self.book.name} rows, replacing {changed.sum()}")
+
+        merged = pd.concat(
+            [transactions[~changed], delta.reindex(columns=transactions.columns)],
+            ignore_index=True)
+        if 'Bill Date' in merged.columns:
+            merged = merged.sort_values('Bill Date', kind='stable', ignore_index=True)
+        return merged
+
+    def write_cached_transactions(self) -> None:
+        """Snapshots the raw transactions and their cancelled transactions, if caching."""
+        if self.cache is not None:
+            self.cache.write(
+                self.book.id, self.date_range, self._raw_transactions, self.cancelled_transactions)
+
     def query_db(self) -> pd.DataFrame:
         """
         Queries the database and returns the results as a pandas DataFrame.
@@ -78,27 +335,77 @@ class Report:
         """
 
         # Retrieve the SQL query string from toml file
-        sql_query = get_data('sql')
+        sql_query = get_sql()
 
         # Get a SQLAlchemy engine instance for database interaction
         engine = SQLEngine.get()
 
         logger.info("Querying database...")
 
+        params = (
+            self.book.id,  # Bind the book ID as a parameter
+            self.date_range.start,  # Bind the start date as a parameter
+            self.date_range.end  # Bind the end date as a parameter
+        )
+
+        if self.chunksize:
+            return self.query_db_chunked(sql_query, engine, params)
+
         # Execute the SQL query and return the results as a DataFrame
         dataframe = pd.read_sql(
             sql_query,  # The SQL query string
             engine,  # The SQLAlchemy engine
-            params=(
-                self.book.id,  # Bind the book ID as a parameter
-                self.date_range.start,  # Bind the start date as a parameter
-                self.date_range.end  # Bind the end date as a parameter
-            )
+            params=params
         )
 
         # A post processing to remove cancelled transactions
         return self.remove_cancelled_transactions(dataframe)
 
+    def query_db_chunked(self, sql_query: str, engine, params: tuple) -> pd.DataFrame:
+        """
+        Streams the query results in chunks of `self.chunksize` rows, so that
+        only one chunk of the unfiltered result is held in memory at a time.
+
+        Each chunk is stripped of its cancelled transactions and projected to
+        the book columns (plus the round off and snapshot columns) before concatenation.
+
+        Args:
+            sql_query (str): The SQL query string.
+            engine: The SQLAlchemy engine.
+            params (tuple): The query parameters.
+
+        Returns:
+            A pandas DataFrame containing the filtered and projected results.
+        """
+        columns = self.get_projected_columns()
+
+        chunks = []
+        for chunk in pd.read_sql(sql_query, engine, params=params, chunksize=self.chunksize):
+            chunk = self.remove_cancelled_transactions(chunk)
+            chunks.append(chunk.loc[:, columns])
+        logger.debug(f"Read {len(chunks)} chunks of up to {self.chunksize} rows")
+
+        if not chunks:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    def get_projected_columns(self) -> List[str]:
+        """Returns the columns kept from the streamed query results, see query_db_chunked."""
+        return list(dict.fromkeys(
+            self.book.columns.column_names + ROUNDOFF_COLUMNS + SNAPSHOT_COLUMNS))
+
+    def load_raw_transactions(self, dataframe: pd.DataFrame) -> None:
+        """
+        Loads already queried transactions of this book, e.g. from a batched
+        query, in place of querying the database.
+
+        Args:
+            dataframe (pd.DataFrame): The queried transactions of this book.
+        """
+        self._raw_transactions = self.remove_cancelled_transactions(dataframe)
+        self._transactions = None
+        self.write_cached_transactions()
+
     def process_transactions(self) -> pd.DataFrame:
         """
         Filters and processes transactions to match the book format,
@@ -109,51 +416,61 @@ class Report:
 
         Returns:
             A DataFrame with filtered columns, empty columns for fitting,
-            and temporary numeric conversion for missing PANs.
+            and PANs as numbers with empty strings for missing PANs.
         """
-
-        # Filter the DataFrame to keep only the columns specified in the book filter
-        df = self.raw_transactions.loc[:, self.book.columns.column_names]
+        raw_transactions = self.raw_transactions
 
         # Reshape for fitting:
-        # Insert empty columns at specified indices to match the template structure
+        # Empty columns sit at the specified indices to match the template structure
+        columns = list(self.book.columns.column_names)
         for index in self.book.emptycols.indices:
-            df.insert(index, index, None)
-
-        # Handling missing PANs:
-        # Temporarily convert empty PANs to numeric 000 for compatibility
-        df['Vat Pan No'] = df['Vat Pan No'].mask(df['Vat Pan No'] == '', 000)
-        df['Vat Pan No'] = df['Vat Pan No'].astype(int)
+            columns.insert(index, index)
 
-        # Restore empty PANs as empty strings after numeric processing
-        df['Vat Pan No'] = df['Vat Pan No'].mask(df['Vat Pan No'] == 000, '')
+        # Assemble all columns in a single allocation
+        data = {}
+        for column in columns:
+            if column == 'Vat Pan No':
+                data[column] = normalize_pan(raw_transactions[column])
+            elif column in self.book.columns.column_names:
+                data[column] = raw_transactions[column]
+            else:
+                data[column] = np.full(len(raw_transactions), None, dtype=object)
 
-        return df
+        # The columns are not modified afterwards, so they are shared rather than copied
+        return pd.DataFrame(data, index=raw_transactions.index, columns=columns, copy=False)
 
     def process_cancelled_transactions(self, dataframe: pd.DataFrame):
         """Modify cancelled tranaction's amounts to '-'"""
-        amount_columns = ['Grand Total', 'Total w Round',
-                          'Taxable Amount', 'Tax Amount']
-        for index, row in dataframe.iterrows():
-            if row['Status'] == '001-03':
-                for col in amount_columns:
-                    dataframe.loc[index, col] = '-'
-                logger.warning(
-                    f"Transaction {row['Transaction ID']} status is: {row['Modify Type']}")
-                self.cancelled_transactions.append(row['Transaction ID'])
+        cancelled = dataframe['Status'].eq(CANCELLED_STATUS)
+        if cancelled.any():
+            # Amount columns turn into mixed numbers and dashes
+            dataframe[AMOUNT_COLUMNS] = dataframe[AMOUNT_COLUMNS].astype(object)
+            dataframe.loc[cancelled, AMOUNT_COLUMNS] = '-'
+            self.log_cancelled_transactions(dataframe[cancelled])
         return dataframe
 
     def remove_cancelled_transactions(self, dataframe: pd.DataFrame):
         """Delete cancelled tranactions based on its Status is equal to '001-03'"""
-        deleted_indices = []
-        for index, row in dataframe.iterrows():
-            if row['Status'] == '001-03':
-                deleted_indices.append(index)
-                logger.warning(
-                    f"Transaction {row['Transaction ID']} status is: {row['Modify Type']}")
-                logger.info(f"Row {index + 1} was deleted sucessfully!")
-                self.cancelled_transactions.append(row['Transaction ID'])
-        return dataframe.drop(deleted_indices)
+        cancelled = dataframe['Status'].eq(CANCELLED_STATUS)
+        if cancelled.any():
+            self.log_cancelled_transactions(dataframe[cancelled])
+            logger.info(f"{cancelled.sum()} cancelled rows were deleted sucessfully!")
+        return dataframe[~cancelled]
+
+    def log_cancelled_transactions(self, cancelled: pd.DataFrame) -> None:
+        """
+        Records the cancelled transactions and logs a single summary for them.
+
+        Args:
+            cancelled (pd.DataFrame): The slice of cancelled transactions.
+        """
+        transaction_ids = cancelled['Transaction ID'].tolist()
+        self.cancelled_transactions.extend(transaction_ids)
+        modify_types = cancelled['Modify Type'].fillna('').value_counts()
+        logger.warning(
+            f"{len(transaction_ids)} {self.book.name} transactions are cancelled "
+            f"({', '.join(f'{kind or None}: {count}' for kind, count in modify_types.items())}): "
+            f"{', '.join(map(str, transaction_ids))}")
 
     def get_template_buffer(self):
         """
@@ -173,63 +490,80 @@ class Report:
 
         return template_data
 
-    def fill_report_details(self) -> None:
+    def load_report_workbook(self) -> Workbook:
         """
-        Fills in report details (PAN no., filing year, month, etc.) in the template buffer.
+        Loads the template workbook with report details (PAN no., filing year, month, etc.) filled in.
 
         Args:
             self: The instance of the class containing the report data.
+
+        Returns:
+            The template workbook with the report details.
         """
 
         # Get necessary report details
-        data = get_data('details')
+        details = get_company_details()
 
         # Construct the detail string using formatted placeholders
         detail = u'करदाता दर्ता नं (PAN) : {}        करदाताको नाम: {}         साल: {}    कर अवधि: {}'.format(
-            data['PAN'], data['office_name'], self.filing_month.year, self.filing_month_name)
+            details.pan, details.office_name, self.filing_month.year, self.filing_month_name)
 
         # Load the template buffer from its path
-        template_buffer = self.get_template_buffer()
-        workbook = load_workbook(template_buffer)
-        sheet = workbook.active  # Access the active sheet
+        with timed(self.timings, 'template'):
+            template_buffer = self.get_template_buffer()
+
+        with timed(self.timings, 'fill'):
+            workbook = load_workbook(template_buffer)
+            # The book sheet, which is the one copied in write-only mode
+            sheet = workbook[self.book.sheet]
+
+            # Write the detail string to cell A4
+            sheet["A4"] = detail
 
-        # Write the detail string to cell A4
-        sheet["A4"] = detail
+        return workbook
+
+    def fill_report_details(self) -> None:
+        """
+        Fills in report details (PAN no., filing year, month, etc.) in the template buffer.
 
-        # Save the modified workbook to the report buffer
-        workbook.save(self.buffer)
+        Args:
+            self: The instance of the class containing the report data.
+        """
+        workbook = self.load_report_workbook()
+
+        with timed(self.timings, 'fill'):
+            # Save the modified workbook to the report buffer
+            workbook.save(self.buffer)
 
     def populate_report_buffer(self) -> None:
         """
-        Populates the report buffer with transaction data, building upon existing content.
+        Populates the report buffer with transaction data below the template header,
+        loading the template and serializing the workbook only once.
 
         Args:
             self: The instance of the class containing the report data.
         """
 
-        # Fill in any necessary report details (e.g., PAN no., filing year)
-        self.fill_report_details()
+        # Process the transactions beforehand so that querying is timed on its own
+        transactions = self.transactions
+
+        # Load the template with the report details (e.g., PAN no., filing year)
+        workbook = self.load_report_workbook()
 
-        # Read existing content from the buffer to determine the starting row for appending
-        # Use openpyxl for compatibility
-        reader = pd.read_excel(self.buffer, engine='openpyxl')
+        with timed(self.timings, 'fill'):
+            sheet = workbook[self.book.sheet]
 
-        # Open the buffer in append mode, using openpyxl for compatibility and allowing sheet overlay
-        with pd.ExcelWriter(
-            self.buffer,
-            mode='a',
-            engine='openpyxl',
-            if_sheet_exists='overlay',  # Overlay existing sheet with the same name
-        ) as writer:
+            if self.write_only:
+                workbook = Workbook(write_only=True)
+                report_sheet = workbook.create_sheet(self.book.sheet)
+                copy_template_header(sheet, report_sheet)
+                for row in iter_rows(transactions):
+                    report_sheet.append(row)
+            else:
+                # Begin appending after the existing content of the template
+                write_rows(sheet, transactions, start_row=get_header_offset(sheet) + 1)
 
-            # Write the transaction data to the specified sheet, starting after the existing content
-            self.transactions.to_excel(
-                writer,
-                index=False,  # Exclude the DataFrame index
-                header=False,  # Exclude column headers
-                sheet_name=self.book.sheet,  # Use the sheet name from the book object
-                startrow=len(reader) + 1  # Begin appending after existing rows
-            )
+            workbook.save(self.buffer)
 
     def save(self):
         """
@@ -237,12 +571,26 @@ class Report:
         transactions and write the buffer to report's filepath
         """
         self.populate_report_buffer()
-        write_bytes_to_disk(self.buffer, self.save_filepath)
+        with timed(self.timings, 'write'):
+            write_bytes_to_disk(self.buffer, self.save_filepath)
+
+    def get_transactions_above_1L_frame(self) -> pd.DataFrame:
+        """
+        Aggregate transactions based on PAN Value and return the ones with
+        'Grand Total' above 1 lakh as a frame, see aggregate_transactions_above_1L.
+
+        Args:
+            self: The instance of the class containing the transactions data.
+
+        Returns:
+            A DataFrame with the fields of TransactionAbove1L as columns.
+        """
+        return aggregate_transactions_above_1L(self.transactions, self.book.symbol)
 
     def get_transactions_above_1L(self) -> List[TransactionAbove1L]:
         """
         Aggregate transactions based on PAN Value and return a list of
-        transactions with 'Taxable Amount' above 1 lakh, represented as TransactionAbove1L objects.
+        transactions with 'Grand Total' above 1 lakh, represented as TransactionAbove1L objects.
 
         Args:
             self: The instance of the class containing the transactions data.
@@ -251,47 +599,14 @@ class Report:
             A list of TransactionAbove1L objects, each representing a transaction with:
             - Vat Pan No
             - Bill Receiveable Person
-            - 'E' (purpose unknown, add a comment if possible)
+            - 'E' as the trade name type
             - Book symbol
             - Taxable Amount
-            - 0 (purpose unknown, add a comment if possible)
+            - 0 as the exempted amount
         """
-
-        # Initialize an empty list to store filtered transactions
-        transactions_above_1L = []
-
-        # Filter transactions with a valid 'Vat Pan No' (non-empty strings)
-        transactions_PAN = self.transactions[
-            self.transactions['Vat Pan No'].astype(bool)
-        ]
-
-        # Group transactions by 'Vat Pan No' and aggregate relevant information
-        transactions_PAN = transactions_PAN.groupby('Vat Pan No').agg({
-            'Bill Receiveable Person': 'first',  # Keep the first 'Bill Receiveable Person'
-            'Taxable Amount': 'sum',  # Sum the 'Taxable Amount' for each PAN
-            'Grand Total': 'sum',  # Sum the 'Grand Total' for each PAN
-        }).reset_index()
-
-        # Filter transactions where 'Grand Total' is above 1,00,000
-        transactions_PAN = transactions_PAN[
-            transactions_PAN['Grand Total'].gt(1_00_000)
-        ].reset_index()
-
-        # The resulting 'transactions_PAN' DataFrame contains aggregated transactions
-        # with 'Taxable Amount' above 1,00,000 for each unique 'Vat Pan No'.
-
-        # Iterate through the filtered transactions and construct the output DataFrame:
-        for _, row in transactions_PAN.iterrows():
-            transactions_above_1L.append(TransactionAbove1L(
-                row['Vat Pan No'],
-                row['Bill Receiveable Person'],
-                'E',
-                self.book.symbol,
-                row['Taxable Amount'],
-                0
-            ))
-
-        return transactions_above_1L
+        transactions_PAN = self.get_transactions_above_1L_frame()
+        return list(map(TransactionAbove1L._make,
+                        transactions_PAN.itertuples(index=False, name=None)))
 
     def print_cancelled_transactions(self):
         """
@@ -338,3 +653,12 @@ class Report:
         print(f"Taxable Amount Sum: {taxable_amount_sum}")
         print(f"Tax Amount Sum: {tax_amount_sum}")
         print(f"Total Transactions: {total_transactions}\n")
+
+    def print_timings(self):
+        """
+        Prints the wall-clock time spent in each stage of the report.
+        """
+        if self.timings:
+            stages = ", ".join(
+                f"{stage}: {seconds:.3f}s" for stage, seconds in self.timings.items())
+            print(f"{self.book.name.capitalize()} timings: {stages}")
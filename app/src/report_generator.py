@@ -1,26 +1,81 @@
-from typing import Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
+import pandas as pd
 from settings import SHEETS_DIR
 
 from src.books import Book, Books
+from src.configurations import get_sql
+from src.date_range import ADDateRange
+from src.db_connection import SQLEngine
 from src.filingmonth import FilingMonth
-from src.one_lakh_plus_transactions import LakhBusters
+from src.loggerfactory import LoggerFactory
+from src.one_lakh_plus_transactions import LakhBusters, aggregate_transactions_above_1L
+from src.queries import filter_transaction_types
 from src.report import Report
+from src.timing import timed
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+def partition_by_month(transactions: pd.DataFrame, date_ranges: Sequence[ADDateRange]) -> List[pd.DataFrame]:
+    """
+    Splits the transactions into the consecutive date ranges of their 'Bill Date'.
+
+    Args:
+        transactions (pd.DataFrame): The transactions within the span of the date ranges.
+        date_ranges (Sequence[ADDateRange]): Consecutive date ranges, e.g. of filing months.
+
+    Returns:
+        List[pd.DataFrame]: The transactions within each date range, in bill date order.
+    """
+    # A SQL date column arrives as datetime.date objects, which do not compare with timestamps
+    bill_dates = pd.to_datetime(transactions['Bill Date']).to_numpy()
+    order = bill_dates.argsort(kind='stable')
+    transactions = transactions.iloc[order]
+    # Each range runs from its start up to the start of the next one
+    boundaries = pd.to_datetime(
+        [date_range.start for date_range in date_ranges]
+        + [date_ranges[-1].end + pd.Timedelta(days=1)])
+    positions = bill_dates[order].searchsorted(boundaries.to_numpy())
+    return [
+        transactions.iloc[start:end]
+        for start, end in zip(positions[:-1], positions[1:])
+    ]
 
 
 class ReportGenerator:
     """
     Generates report based on the given filing month and book. If book is None, reports are generated for all purchase and sales books.
     Also, updates lakh_busters with the transactions above 1L.
+
+    With batch_fetch, the transactions of all books are fetched in a single query
+    and split per book in memory instead of querying once per book.
+
+    With concurrent, the reports of all books are built and saved in a thread pool,
+    while the 1L updates and console summaries still follow the book order.
+
+    generate_fiscal_year builds every month of the fiscal year from a single query.
     """
 
-    def __init__(self, filingMonth: FilingMonth):
+    def __init__(
+        self,
+        filingMonth: FilingMonth,
+        batch_fetch: bool = False,
+        concurrent: bool = False,
+    ):
         self.filingMonth = filingMonth
+        self.batch_fetch = batch_fetch
+        self.concurrent = concurrent
         self.work_dir = SHEETS_DIR.joinpath(
             self.filingMonth.get_fiscal_year().replace("/", "-"),
             self.filingMonth.nepali_month_name(),
         )
         self._lakh_busters: Optional[LakhBusters] = None
+        # Wall-clock time of the stages shared by all books, e.g. the batched query
+        self.timings: Dict[str, float] = {}
 
     @property
     def lakh_busters(self) -> LakhBusters:
@@ -42,34 +97,174 @@ class ReportGenerator:
         Returns:
             None
         """
-        if book is None:
-            books = (Books.SALES.value, Books.PURCHASE.value)
-        else:
-            books = (book,)
-        for selected_book in books:
-            report = self.get_report(selected_book)
+        start = perf_counter()
+        self.timings = {}
+        books = self.get_books(book)
 
+        reports = [self.get_report(selected_book) for selected_book in books]
+        if self.batch_fetch and len(books) > 1:
+            # Only the books without a snapshot of their transactions are fetched
+            pending = []
+            for selected_book, report in zip(books, reports):
+                with timed(report.timings, 'query'):
+                    if not (report.read_cached_transactions() or report.load_incremental_transactions()):
+                        pending.append((selected_book, report))
+            if pending:
+                with timed(self.timings, 'batch query'):
+                    transactions = self.fetch_transactions(
+                        [selected_book for selected_book, _ in pending])
+                for selected_book, report in pending:
+                    report.load_raw_transactions(transactions[selected_book.id])
+
+        self._save_reports(reports)
+
+        for report in reports:
             # Only use lakh_busters if generating for multiple books
             if book is None:
-                transactions_above_1L = report.get_transactions_above_1L()
-                self.lakh_busters.update_lakh_busters(transactions_above_1L)
+                transactions_above_1L = report.get_transactions_above_1L_frame()
+                self.lakh_busters.update_lakh_busters_frame(transactions_above_1L)
 
-            self._generate_report_outputs(report)
+            self._print_report_outputs(report)
 
         # Only save lakh_busters if generating for multiple books
         if book is None:
             self.lakh_busters.save()
 
-    def _generate_report_outputs(self, report: Report) -> None:
+        self.print_timings()
+        print(f"Total time: {perf_counter() - start:.3f}s\n")
+
+    def generate_fiscal_year(self, book: Union[Book, None], months: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Generate the reports of every month of the fiscal year of the filing month from a
+        single query over the whole AD span, split into months in memory. If generating
+        for multiple books over the whole year, the yearly 1L file is saved as well.
+
+        Parameters:
+            book (Union[Book, None]): The book for which the reports are generated. If None, reports are generated for all purchase and sales books.
+            months (Optional[Tuple[int, int]]): The first and last month to generate, in fiscal order. Defaults to the whole fiscal year.
+
+        Returns:
+            None
         """
-        Generate the report outputs and save the report.
-        :param report: The report object to generate outputs for.
+        start = perf_counter()
+        self.timings = {}
+        books = self.get_books(book)
+        fiscal_year = int(self.filingMonth.get_fiscal_year().split("/")[0])
+        filing_months = FilingMonth.from_fiscal_year(fiscal_year, months)
+        date_ranges = [filing_month.get_AD_date_range() for filing_month in filing_months]
+
+        with timed(self.timings, 'batch query'):
+            transactions = self.fetch_transactions(
+                books, ADDateRange(date_ranges[0].start, date_ranges[-1].end))
+        with timed(self.timings, 'partition'):
+            monthly_transactions = {
+                book_id: partition_by_month(dataframe, date_ranges)
+                for book_id, dataframe in transactions.items()
+            }
+
+        book_reports: Dict[int, List[Report]] = {selected_book.id: [] for selected_book in books}
+        for index, filing_month in enumerate(filing_months):
+            report_generator = ReportGenerator(filing_month, concurrent=self.concurrent)
+            reports = [report_generator.get_report(selected_book) for selected_book in books]
+            for selected_book, report in zip(books, reports):
+                report.load_raw_transactions(monthly_transactions[selected_book.id][index])
+                book_reports[selected_book.id].append(report)
+
+            report_generator._save_reports(reports)
+            for report in reports:
+                self._print_report_outputs(report)
+
+        # The 1L file is filed for the whole fiscal year
+        if book is None and months is None:
+            lakh_busters = LakhBusters(self.work_dir.parent)
+            lakh_busters.reset_busters()
+            for selected_book in books:
+                yearly_transactions = pd.concat(
+                    [report.transactions for report in book_reports[selected_book.id]],
+                    ignore_index=True)
+                lakh_busters.update_lakh_busters_frame(
+                    aggregate_transactions_above_1L(yearly_transactions, selected_book.symbol))
+            lakh_busters.save()
+
+        self.print_timings()
+        print(f"Total time: {perf_counter() - start:.3f}s\n")
+
+    @staticmethod
+    def get_books(book: Union[Book, None]) -> Tuple[Book, ...]:
+        """Returns the given book, or all purchase and sales books if it is None."""
+        if book is None:
+            return (Books.SALES.value, Books.PURCHASE.value)
+        return (book,)
+
+    def _save_reports(self, reports: List[Report]) -> None:
+        """
+        Save the reports, in a thread pool if running concurrently.
+        :param reports: The report objects to save.
+        :return: None
+        """
+        if self.concurrent and len(reports) > 1:
+            with ThreadPoolExecutor(max_workers=len(reports)) as executor:
+                futures = [executor.submit(report.save) for report in reports]
+                # Wait in book order and re-raise the first failure
+                for future in futures:
+                    future.result()
+        else:
+            for report in reports:
+                report.save()
+
+    def print_timings(self) -> None:
+        """
+        Prints the wall-clock time spent in the stages shared by all books,
+        which the timings of the single reports leave out.
+        """
+        if self.timings:
+            stages = ", ".join(
+                f"{stage}: {seconds:.3f}s" for stage, seconds in self.timings.items())
+            print(f"Shared timings: {stages}")
+
+    def _print_report_outputs(self, report: Report) -> None:
+        """
+        Print the outputs of a saved report.
+        :param report: The report object to print outputs for.
         :return: None
         """
-        report.save()
         # report.print_cancelled_transactions()
         report.print_transactions_with_roundoff()
         report.print_transactions_summary()
+        report.print_timings()
+
+    def fetch_transactions(
+        self,
+        books: Iterable[Book],
+        date_range: Optional[ADDateRange] = None,
+    ) -> Dict[int, pd.DataFrame]:
+        """
+        Fetch the transactions of the given books in a single round trip and
+        split them per book.
+
+        Args:
+            books (Iterable[Book]): The books to fetch the transactions for.
+            date_range (Optional[ADDateRange]): The date range to fetch. Defaults to the filing month.
+
+        Returns:
+            Dict[int, pd.DataFrame]: The transactions keyed by the book id.
+        """
+        book_ids = [book.id for book in books]
+        sql_query = filter_transaction_types(get_sql(), len(book_ids))
+        date_range = date_range or self.filingMonth.get_AD_date_range()
+
+        logger.info(f"Querying database for {len(book_ids)} books...")
+        dataframe = pd.read_sql(
+            sql_query,
+            SQLEngine.get(),
+            params=(*book_ids, date_range.start, date_range.end)
+        )
+
+        transaction_types = dataframe['Transaction Type']
+        return {
+            book_id: dataframe[transaction_types.eq(book_id)]
+            for book_id in book_ids
+        }
 
     def get_report(self, book: Book) -> Report:
         """
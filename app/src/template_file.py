@@ -1,7 +1,8 @@
 import hashlib
 from io import BytesIO
-from typing import Literal
-from settings import DOWNLOAD, HASH_VALUE, TEMPLATE_SAVE_DIR
+from pathlib import Path
+from typing import Literal, Optional
+from settings import DOWNLOAD, HASH_VALUE, TEMPLATE_CACHE_DIR, TEMPLATE_SAVE_DIR
 from src.books import Book
 from src.cbms import TokenAuth
 from src.customsession import CustomSession
@@ -26,12 +27,14 @@ class TemplateFile:
         self.session = session
         self.token_auth = token_auth
 
-    def get(self, book: Book) -> BytesIO:
+    def get(self, book: Book, refresh: bool = False) -> BytesIO:
         """
-        Download the format file from CBMS and return in bytes.
+        Return the format file in bytes, from the local template cache if a copy
+        with the expected MD5 hash exists, otherwise downloaded from CBMS.
 
         Args:
             book (Book): The book object representing the file to be downloaded.
+            refresh (bool): Download the file even if it is cached.
 
         Returns:
             BytesIO: The downloaded file in bytes.
@@ -39,6 +42,12 @@ class TemplateFile:
         Raises:
             Exception: If there is an error validating the file against its MD5 hash.
         """
+        cache_hash = self.get_hash_value(book.name)
+        if not refresh:
+            cached = self.read_cache(book, cache_hash)
+            if cached is not None:
+                return cached
+
         self.session.headers.update(
             {'Content-Disposition': 'attachment; filename=template.xlsx'})
         response = self.session.get(self.session.base_url(
@@ -46,7 +55,6 @@ class TemplateFile:
         logger.info(
             f"{response.request.method} {response.url} [status:{response.status_code} request:{response.elapsed.total_seconds():.3f}s]")
         response.raise_for_status()
-        cache_hash = self.get_hash_value(book.name)
         buffer = BytesIO(response.content)
 
         if DOWNLOAD:
@@ -65,8 +73,49 @@ class TemplateFile:
         if not self.__validate_bytes(buffer.getvalue(), cache_hash):
             raise FileValidationError(
                 f'Error validating the file against its MD5 hash. Expected: {cache_hash}, Got: {self.computed_hash}')
+        write_bytes_to_disk(buffer, self.get_cache_path(book, cache_hash))
         return buffer
 
+    def get_cache_path(self, book: Book, hash: str) -> Path:
+        """
+        Returns the content-addressed path of the book's template in the cache.
+
+        Args:
+            book (Book): The book object representing the template.
+            hash (str): The md5 hash of the template.
+
+        Returns:
+            Path: The path of the cached template.
+        """
+        suffix = ".xls" if book.name == "File 1L+" else ".xlsx"
+        return TEMPLATE_CACHE_DIR / f"{hash}{suffix}"
+
+    def read_cache(self, book: Book, hash: str) -> Optional[BytesIO]:
+        """
+        Reads the book's template from the cache if its content matches the hash.
+
+        Args:
+            book (Book): The book object representing the template.
+            hash (str): The expected md5 hash of the template.
+
+        Returns:
+            Optional[BytesIO]: The cached template, or None on a cache miss or a hash mismatch.
+        """
+        cache_path = self.get_cache_path(book, hash)
+        if not cache_path.exists():
+            logger.debug(f"Template cache miss for {book.name}")
+            return None
+
+        content = cache_path.read_bytes()
+        if not self.__validate_bytes(content, hash):
+            logger.warning(
+                f"Cached {book.name} template does not match its MD5 hash, downloading again")
+            cache_path.unlink()
+            return None
+
+        logger.debug(f"Using cached {book.name} template {cache_path.name}")
+        return BytesIO(content)
+
     def get_hash_value(self, book_name: Literal["purchase", "sales", "File 1L+"]) -> str:
         """
         Returns hash value for the respective book or raise ValueError
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator
+
+from src.loggerfactory import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """
+    Measures the wall-clock time of the enclosed block and adds it to the
+    given stage, so that a stage entered several times accumulates.
+
+    Args:
+        timings (Dict[str, float]): The timings in seconds keyed by stage.
+        stage (str): The name of the stage being measured.
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        timings[stage] = timings.get(stage, 0.0) + elapsed
+        logger.debug(f"{stage} took {elapsed:.3f}s")
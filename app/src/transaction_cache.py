@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+import pandas as pd
+from settings import DRIVE_CACHE_PATH, TRANSACTION_CACHE_DIR
+
+from src.date_range import ADDateRange
+from src.loggerfactory import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+class Watermark(NamedTuple):
+    """
+    Represents the newest transaction of a snapshot:
+    - transaction_id: Highest transaction id
+    - bill_date: Latest bill date
+    """
+
+    transaction_id: Any
+    bill_date: datetime
+
+
+class Snapshot(NamedTuple):
+    """
+    Represents the snapshot of the transactions of a book and date range:
+    - transactions: The queried transactions, without the cancelled ones
+    - cancelled_transactions: The ids of the cancelled transactions
+    - watermark: The newest transaction, None if it is unknown
+    """
+
+    transactions: pd.DataFrame
+    cancelled_transactions: List
+    watermark: Optional[Watermark]
+
+
+def to_json_scalar(value: Any) -> Any:
+    """Converts a numpy scalar into the equivalent Python scalar."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def get_digest(*parts: Any) -> str:
+    """Returns a short digest identifying the JSON serializable parts."""
+    return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()[:12]
+
+
+def get_watermark(dataframe: pd.DataFrame) -> Optional[Watermark]:
+    """
+    Returns the newest transaction of the transactions, or None if there are
+    none or they lack the transaction id or bill date.
+
+    Args:
+        dataframe (pd.DataFrame): The queried transactions.
+    """
+    if dataframe.empty or not {'Transaction ID', 'Bill Date'}.issubset(dataframe.columns):
+        return None
+    return Watermark(
+        to_json_scalar(dataframe['Transaction ID'].max()),
+        pd.Timestamp(dataframe['Bill Date'].max()).to_pydatetime(),
+    )
+
+
+class TransactionCache:
+    """
+    Parquet snapshots of the queried transactions of a book and date range.
+
+    Rows in a restored backup do not change until another backup is restored,
+    so the snapshots live in a directory named after the latest restore recorded
+    in drive_cache.json, i.e. its backup name, md5 checksum and restore time.
+    Restoring any backup, even one uploaded again under the same name, changes
+    that directory, which invalidates every snapshot taken before it. Until a
+    book and date range is snapshotted after the restore, its older snapshot
+    remains readable as the base of an incremental query.
+
+    Snapshot names also carry a digest of the query and the kept columns, so
+    that snapshots of another query shape are never read.
+    """
+
+    def __init__(
+        self,
+        backup_name: str,
+        cache_dir: Optional[Path] = None,
+        restore_id: Optional[str] = None,
+        query_id: Optional[str] = None,
+    ):
+        """
+        Initialize the cache of the given backup.
+
+        Args:
+            backup_name (str): The name of the restored backup file.
+            cache_dir (Optional[Path]): The root directory of the snapshots. Defaults to TRANSACTION_CACHE_DIR.
+            restore_id (Optional[str]): The digest of the restore of the backup, see for_current_backup.
+            query_id (Optional[str]): The digest of the query shape, see for_current_backup.
+        """
+        self.backup_name = backup_name
+        self.cache_dir = cache_dir or TRANSACTION_CACHE_DIR
+        backup_dir_name = Path(backup_name).stem
+        if restore_id:
+            backup_dir_name += f"_{restore_id}"
+        self.backup_dir = self.cache_dir / backup_dir_name
+        self.query_id = query_id
+
+    @classmethod
+    def for_current_backup(
+        cls,
+        sql_query: str = '',
+        columns: Optional[Sequence[str]] = None,
+    ) -> Optional["TransactionCache"]:
+        """
+        Returns the cache of the latest restore recorded in the restore history of
+        drive_cache.json, or None if no restore is recorded. A downloaded backup
+        is only recorded there once it was restored successfully.
+
+        Args:
+            sql_query (str): The report query, before its parameters are bound.
+            columns (Optional[Sequence[str]]): The columns kept from the query results, None for all.
+        """
+        try:
+            with DRIVE_CACHE_PATH.open('r', encoding='utf-8') as f:
+                restore: dict = json.load(f)['restore_history'][-1]
+            backup_name = restore['name']
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            return None
+        return cls(
+            backup_name,
+            restore_id=get_digest(backup_name, restore.get('md5Checksum'), restore.get('restored_at')),
+            query_id=get_digest(sql_query, columns and list(columns)),
+        )
+
+    def get_path(self, book_id: int, date_range: ADDateRange) -> Path:
+        """Returns the snapshot path of the book transactions within the date range."""
+        filename = f"{book_id}_{date_range.start:%Y%m%d}_{date_range.end:%Y%m%d}"
+        if self.query_id:
+            filename += f"_{self.query_id}"
+        return self.backup_dir / f"{filename}.parquet"
+
+    def read(self, book_id: int, date_range: ADDateRange) -> Optional[Snapshot]:
+        """
+        Reads the snapshot of the book transactions within the date range.
+
+        Args:
+            book_id (int): The id of the book.
+            date_range (ADDateRange): The queried date range.
+
+        Returns:
+            Optional[Snapshot]: The snapshot, or None if there is none.
+        """
+        return self.read_path(self.get_path(book_id, date_range))
+
+    def read_previous(self, book_id: int, date_range: ADDateRange) -> Optional[Snapshot]:
+        """
+        Reads the newest snapshot of the book transactions within the date range
+        which was taken from an older backup, before it is removed as stale.
+
+        Args:
+            book_id (int): The id of the book.
+            date_range (ADDateRange): The queried date range.
+
+        Returns:
+            Optional[Snapshot]: The snapshot, or None if there is none.
+        """
+        if not self.cache_dir.exists():
+            return None
+        filename = self.get_path(book_id, date_range).name
+        paths = [
+            backup_dir / filename for backup_dir in self.cache_dir.iterdir()
+            if backup_dir != self.backup_dir and (backup_dir / filename).exists()
+        ]
+        for path in sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True):
+            snapshot = self.read_path(path)
+            if snapshot is not None:
+                return snapshot
+        return None
+
+    @staticmethod
+    def read_path(path: Path) -> Optional[Snapshot]:
+        """Reads the snapshot at the path, or returns None if it is missing or unreadable."""
+        sidecar_path = path.with_suffix('.json')
+        if not (path.exists() and sidecar_path.exists()):
+            return None
+        try:
+            dataframe = pd.read_parquet(path)
+            with sidecar_path.open('r', encoding='utf-8') as f:
+                sidecar: dict = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable transaction snapshot {path.name}: {e}")
+            return None
+        logger.debug(f"Loaded {len(dataframe)} transactions from {path.name}")
+        watermark = sidecar.get('watermark')
+        if watermark is not None:
+            watermark = Watermark(
+                watermark['transaction_id'], datetime.fromisoformat(watermark['bill_date']))
+        return Snapshot(dataframe, sidecar['cancelled_transactions'], watermark)
+
+    def write(self, book_id: int, date_range: ADDateRange, dataframe: pd.DataFrame, cancelled_transactions: List) -> None:
+        """
+        Writes the snapshot of the book transactions within the date range and
+        removes its snapshots from older backups. Failures are logged, not raised,
+        as the report does not depend on the snapshot.
+
+        Args:
+            book_id (int): The id of the book.
+            date_range (ADDateRange): The queried date range.
+            dataframe (pd.DataFrame): The queried transactions.
+            cancelled_transactions (List): The ids of the cancelled transactions.
+        """
+        path = self.get_path(book_id, date_range)
+        partial_path = path.with_suffix('.part')
+        try:
+            self.remove_stale(path.name)
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            dataframe.to_parquet(partial_path)
+            os.replace(partial_path, path)
+            watermark = get_watermark(dataframe)
+            with path.with_suffix('.json').open('w', encoding='utf-8') as f:
+                json.dump({
+                    'cancelled_transactions': list(map(to_json_scalar, cancelled_transactions)),
+                    'watermark': watermark and {
+                        'transaction_id': watermark.transaction_id,
+                        'bill_date': watermark.bill_date.isoformat(),
+                    },
+                }, f)
+        except Exception as e:
+            partial_path.unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+            logger.warning(f"Could not write transaction snapshot {path.name}: {e}")
+            return
+        logger.debug(f"Saved {len(dataframe)} transactions to {path.name}")
+
+    def remove_stale(self, filename: str) -> None:
+        """
+        Removes the snapshots with the filename taken from other backups, and the
+        directories of other backups left empty. Snapshots of other books and
+        date ranges are kept as the bases of their incremental queries.
+
+        Args:
+            filename (str): The snapshot filename, e.g. `1_20231018_20231116.parquet`.
+        """
+        if not self.cache_dir.exists():
+            return
+        for backup_dir in self.cache_dir.iterdir():
+            if backup_dir.is_dir() and backup_dir != self.backup_dir:
+                stale_path = backup_dir / filename
+                stale_path.unlink(missing_ok=True)
+                stale_path.with_suffix('.json').unlink(missing_ok=True)
+                if not any(backup_dir.iterdir()):
+                    logger.debug(f"Removing stale transaction snapshots of {backup_dir.name}")
+                    backup_dir.rmdir()
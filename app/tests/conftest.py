@@ -22,3 +22,10 @@ def disable_logging():
 
     # Restore the original logging configuration after the tests
     logging.getLogger().handlers = original_logging_config
+
+
+@pytest.fixture(autouse=True)
+def no_restored_backup(tmp_path, monkeypatch):
+    # Keep reports from reading or writing the snapshots of a real restored backup
+    monkeypatch.setattr('src.transaction_cache.DRIVE_CACHE_PATH',
+                        tmp_path / 'drive_cache.json')
@@ -0,0 +1,66 @@
+from unittest.mock import Mock
+
+import pytest
+from batch import main
+from src.books import Books
+
+
+@pytest.fixture
+def mock_report_generator(monkeypatch):
+    mock_report_generator = Mock()
+    monkeypatch.setattr('src.report_generator.ReportGenerator', mock_report_generator)
+    return mock_report_generator
+
+
+def test_generates_month_range(mock_report_generator):
+    assert main(["--fiscal-year", "2080/81", "--months", "11-2"]) == 0
+
+    filing_months = [call.args[0] for call in mock_report_generator.call_args_list]
+    assert [(fm.year, fm.month) for fm in filing_months] == [
+        (2080, 11), (2080, 12), (2081, 1), (2081, 2)]
+    # All books include the 1L+ file
+    for call in mock_report_generator.return_value.generate.call_args_list:
+        assert call.args == (None,)
+
+
+def test_generates_single_book(mock_report_generator):
+    assert main(["--fiscal-year", "2080", "--months", "7", "--books", "sales"]) == 0
+
+    mock_report_generator.return_value.generate.assert_called_once_with(Books.SALES.value)
+
+
+def test_failed_month_sets_exit_status(mock_report_generator):
+    mock_report_generator.return_value.generate.side_effect = [None, RuntimeError("boom"), None]
+
+    assert main(["--fiscal-year", "2080", "--months", "4-6"]) == 1
+    assert mock_report_generator.return_value.generate.call_count == 3
+
+
+def test_single_query(mock_report_generator):
+    assert main(["--fiscal-year", "2080", "--single-query"]) == 0
+
+    filing_month = mock_report_generator.call_args.args[0]
+    assert (filing_month.year, filing_month.month) == (2080, 4)
+    mock_report_generator.return_value.generate_fiscal_year.assert_called_once_with(None, None)
+    mock_report_generator.return_value.generate.assert_not_called()
+
+
+def test_single_query_failure_sets_exit_status(mock_report_generator):
+    mock_report_generator.return_value.generate_fiscal_year.side_effect = RuntimeError("boom")
+
+    assert main(["--fiscal-year", "2080", "--months", "4-6", "--single-query"]) == 1
+
+
+@pytest.mark.parametrize("argv", [
+    [],
+    ["--fiscal-year", "two"],
+    ["--fiscal-year", "2080", "--months", "13"],
+    ["--fiscal-year", "2080", "--months", "2-11"],
+    ["--fiscal-year", "2080", "--books", "1L"],
+])
+def test_invalid_arguments(argv, mock_report_generator):
+    with pytest.raises(SystemExit) as exc_info:
+        main(argv)
+
+    assert exc_info.value.code == 2
+    mock_report_generator.assert_not_called()
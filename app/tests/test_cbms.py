@@ -1,4 +1,9 @@
+import base64
+import json
+import re
+import time
 from unittest.mock import Mock, patch
+import httpretty
 import pytest
 import requests
 
@@ -44,21 +49,113 @@ class TestCBMS:
     def teardown_method(self, method):
         patch.stopall()  # Ensure any mocks are cleaned up
 
+    @pytest.fixture(autouse=True)
+    def token_path(self, tmp_path):
+        token_path = tmp_path / "cbms_token.json"
+        with patch('src.cbms.CBMS_TOKEN_PATH', token_path):
+            yield token_path
+
     @patch('requests.Session.post')
     def test_login_success(self, mock_post, mock_response: Mock):
         mock_post.return_value = mock_response
 
         auth = TokenAuth()
-        assert auth._TOKEN == 'Bearer mock_token'  # Verify token is set correctly
+        assert auth.token == 'Bearer mock_token'  # Verify token is set correctly
 
     @patch('requests.Session.post')
     def test_login_failure(self, mock_post, mock_response_failure: Mock):
         mock_post.return_value = mock_response_failure  # Inject the mock response
 
         with pytest.raises(requests.exceptions.HTTPError) as excinfo:
-            TokenAuth()  # Should raise HTTPError due to failed login
+            TokenAuth().token  # Should raise HTTPError due to failed login
         assert 'Invalid Username or Password !!!' in str(excinfo.value)
 
+    @patch('requests.Session.post')
+    def test_login_is_lazy(self, mock_post):
+        TokenAuth()
+        mock_post.assert_not_called()
+
+    @patch('requests.Session.post')
+    def test_token_expiry_from_jwt(self, mock_post, mock_response: Mock, token_path):
+        expires_at = int(time.time()) + 600
+        payload = base64.urlsafe_b64encode(
+            json.dumps({'exp': expires_at}).encode()).decode().rstrip('=')
+        mock_response.json.return_value['token'] = f"header.{payload}.signature"
+        mock_post.return_value = mock_response
+
+        TokenAuth().token
+
+        assert json.loads(token_path.read_text())['expires_at'] == expires_at
+
+    @patch('requests.Session.post')
+    def test_cached_token_skips_login(self, mock_post, mock_response: Mock, token_path):
+        mock_post.return_value = mock_response
+        TokenAuth().token
+
+        # A new process only has the token cache file
+        TokenAuth.reset_token()
+        assert TokenAuth().token == 'Bearer mock_token'
+        mock_post.assert_called_once()
+
+    @patch('requests.Session.post')
+    def test_expired_cached_token(self, mock_post, mock_response: Mock, token_path):
+        token_path.write_text(json.dumps(
+            {'token': 'Bearer expired_token', 'expires_at': time.time() - 1}))
+        mock_post.return_value = mock_response
+
+        assert TokenAuth().token == 'Bearer mock_token'
+        mock_post.assert_called_once()
+
+    @httpretty.activate
+    def test_relogin_on_401(self):
+        httpretty.register_uri(
+            httpretty.POST,
+            re.compile(r'https://cbms.ird.gov.np:8051/api/auth/login'),
+            responses=[
+                httpretty.Response(body=json.dumps(
+                    {'isSucess': True, 'token': token, 'responseData': {'userName': 'Mock User'}}))
+                for token in ('stale_token', 'fresh_token')
+            ]
+        )
+        httpretty.register_uri(
+            httpretty.GET,
+            re.compile(r'https://cbms.ird.gov.np:8051/template'),
+            responses=[
+                httpretty.Response(body='Unauthorized', status=401),
+                httpretty.Response(body='template', status=200),
+            ]
+        )
+
+        client = CBMS()
+        response = client.get(client.base_url('/template'), auth=TokenAuth())
+
+        assert response.status_code == 200
+        assert response.text == 'template'
+        assert response.history[0].status_code == 401
+        assert response.request.headers['Authorization'] == 'Bearer fresh_token'
+
+    @patch('requests.Session.post')
+    def test_401_keeps_token_of_concurrent_login(self, mock_post, token_path):
+        # Another request logged in again after this one was sent with the stale token
+        TokenAuth._TOKEN = 'Bearer fresh_token'
+        TokenAuth._EXPIRES_AT = time.time() + 3600
+        token_path.write_text(json.dumps(
+            {'token': TokenAuth._TOKEN, 'expires_at': TokenAuth._EXPIRES_AT}))
+        response = requests.Response()
+        response.status_code = 401
+        response._content = b'Unauthorized'
+        response.request = requests.Request(
+            'GET', CBMS().base_url('/template'), headers={'Authorization': 'Bearer stale_token'}).prepare()
+        response.connection = Mock()
+        response.connection.send.return_value = requests.Response()
+
+        retried = TokenAuth().handle_401(response)
+
+        assert retried.request.headers['Authorization'] == 'Bearer fresh_token'
+        assert TokenAuth._TOKEN == 'Bearer fresh_token'
+        assert token_path.exists()
+        mock_post.assert_not_called()
+
     def test_cbms_session_creation(self):
         client = CBMS()
         assert isinstance(client, requests.Session)
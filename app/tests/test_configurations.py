@@ -1,9 +1,33 @@
+import json
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 import yaml
-from src.configurations import get_data
+from src.configurations import (
+    CompanyDetails, IndexDefinition, clear_cache, get_company_details, get_data, get_indexes, get_report_table_sql,
+    get_sql, load_config, use_report_table)
+
+
+@pytest.fixture(autouse=True)
+def empty_config_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+@pytest.fixture
+def temp_config_file(tmp_path):
+    temp_config_file = tmp_path / "temp_runtime_config.yml"
+    with open(temp_config_file, "w+") as fh:
+        yaml.dump({
+            "sql": "SELECT 1",
+            "report_table": {"name": "ReportTransaction", "index": "CREATE CLUSTERED INDEX IX", "sql": "SELECT 2"},
+            "details": {"PAN": 123456789, "office_name": "XYZ STORES"},
+            "items": [{"a": 1}],
+            "indexes": [{"table": "t", "name": "IX_t", "columns": ["a"], "include": ["b"]}],
+        }, fh)
+    return temp_config_file
 
 
 def test_get_data_file_not_found() -> None:
@@ -58,3 +82,83 @@ def test_get_data_yaml_error():
     with patch('yaml.safe_load', side_effect=yaml.YAMLError("Invalid YAML")):
         with pytest.raises(SystemExit):
             get_data("some_key")
+
+
+def test_load_config_is_cached(temp_config_file):
+    with patch('yaml.safe_load', wraps=yaml.safe_load) as mock_safe_load:
+        first = load_config(temp_config_file)
+        second = load_config(temp_config_file)
+
+    assert first is second
+    mock_safe_load.assert_called_once()
+
+
+def test_load_config_reloads_changed_file(temp_config_file):
+    load_config(temp_config_file)
+    with open(temp_config_file, "w") as fh:
+        yaml.dump({"sql": "SELECT 22"}, fh)
+
+    assert get_sql(temp_config_file) == "SELECT 22"
+
+
+def test_load_config_is_read_only(temp_config_file):
+    config = load_config(temp_config_file)
+
+    with pytest.raises(TypeError):
+        config["sql"] = "DROP TABLE"
+    with pytest.raises(TypeError):
+        config["details"]["PAN"] = 0
+    assert config["items"] == ({"a": 1},)
+
+
+def test_typed_accessors(temp_config_file):
+    assert get_sql(temp_config_file) == "SELECT 1"
+    assert get_company_details(temp_config_file) == CompanyDetails(
+        "123456789", "XYZ STORES")
+
+
+def test_report_table_queries(temp_config_file):
+    assert get_sql(temp_config_file, materialized=False) == "SELECT 1"
+    assert get_sql(temp_config_file, materialized=True) == "SELECT 2"
+
+
+def test_report_table_sql_reuses_report_query():
+    statements = get_report_table_sql()
+
+    assert statements.startswith("DROP TABLE IF EXISTS [VatBillingSoftware].[dbo].[ReportTransaction];")
+    assert "INTO [VatBillingSoftware].[dbo].[ReportTransaction]\nFROM" in statements
+    assert "?" not in statements
+    # The joins are taken from the report query rather than copied
+    report_query = get_sql(materialized=False)
+    assert report_query[report_query.index("FROM"):report_query.index("WHERE")] in statements
+
+
+@pytest.mark.parametrize("latest_restore, materialized", [
+    ({"name": "backup_2.bak", "report_table": True}, True),
+    # The flag was turned on after the latest restore, which built no table
+    ({"name": "backup_2.bak"}, False),
+])
+def test_use_report_table(temp_config_file, tmp_path, latest_restore, materialized):
+    drive_cache_path = tmp_path / "drive_cache.json"
+    drive_cache_path.write_text(json.dumps(
+        {"restore_history": [{"name": "backup_1.bak", "report_table": True}, latest_restore]}))
+
+    with patch("src.configurations.USE_REPORT_TABLE", True), \
+            patch("src.configurations.DRIVE_CACHE_PATH", drive_cache_path):
+        assert use_report_table() is materialized
+        # The report query falls back to the billing tables until a restore builds the table
+        assert get_sql(temp_config_file) == ("SELECT 2" if materialized else "SELECT 1")
+
+
+def test_use_report_table_without_restore(tmp_path):
+    with patch("src.configurations.USE_REPORT_TABLE", True), \
+            patch("src.configurations.DRIVE_CACHE_PATH", tmp_path / "drive_cache.json"):
+        assert not use_report_table()
+
+
+def test_use_report_table_disabled():
+    assert not use_report_table()
+
+
+def test_get_indexes(temp_config_file):
+    assert get_indexes(temp_config_file) == (IndexDefinition("t", "IX_t", ("a",), ("b",)),)
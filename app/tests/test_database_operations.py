@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+# Requires the ODBC driver manager (libodbc)
+pyodbc = pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from drive_database import database_operations  # noqa: E402
+from drive_database.database_operations import materialize_report_table, provision_indexes  # noqa: E402
+from src.configurations import IndexDefinition, get_report_table_sql  # noqa: E402
+from src.queries import create_index_if_missing  # noqa: E402
+
+
+CONNECTION_STRING = "DRIVER={ODBC Driver 17 for SQL Server};SERVER=localhost"
+
+
+class FakeCursor:
+    """Records the executed statements, failing those which contain any of the `failing` texts."""
+
+    def __init__(self):
+        self.statements = []
+        self.failing = ()
+
+    def execute(self, statement, *params):
+        self.statements.append(statement)
+        if any(text in statement for text in self.failing):
+            raise pyodbc.ProgrammingError('42000', f"Failed: {statement}")
+        return self
+
+    def nextset(self):
+        return False
+
+
+INDEXES = (
+    IndexDefinition('[db].[dbo].[a]', 'IX_a_1', ('[x]',)),
+    IndexDefinition('[db].[dbo].[a]', 'IX_a_2', ('[y]',), ('[z]',)),
+    IndexDefinition('[db].[dbo].[b]', 'IX_b', ('[x]',)),
+)
+
+
+@pytest.fixture
+def cursor(monkeypatch):
+    cursor = FakeCursor()
+    connection = MagicMock()
+    connection.__enter__.return_value.cursor.return_value = cursor
+    monkeypatch.setattr(database_operations.pyodbc, 'connect', Mock(return_value=connection))
+    return cursor
+
+
+def test_materialize_report_table(cursor):
+    assert materialize_report_table(CONNECTION_STRING)
+
+    assert cursor.statements == [get_report_table_sql()]
+
+
+def test_materialize_report_table_failure(cursor):
+    cursor.failing = ('INTO',)
+
+    assert not materialize_report_table(CONNECTION_STRING)
+
+
+def test_materialize_report_table_connection_failure(monkeypatch):
+    monkeypatch.setattr(database_operations.pyodbc, 'connect',
+                        Mock(side_effect=pyodbc.OperationalError('08001', 'Unreachable')))
+
+    assert not materialize_report_table(CONNECTION_STRING)
+
+
+def test_provision_indexes(cursor, monkeypatch):
+    monkeypatch.setattr(database_operations, 'get_indexes', lambda: INDEXES)
+
+    provision_indexes(CONNECTION_STRING)
+
+    assert cursor.statements == [create_index_if_missing(*index) for index in INDEXES] + [
+        "UPDATE STATISTICS [db].[dbo].[a];",
+        "UPDATE STATISTICS [db].[dbo].[b];",
+    ]
+
+
+def test_provision_indexes_continues_after_failure(cursor, monkeypatch):
+    monkeypatch.setattr(database_operations, 'get_indexes', lambda: INDEXES)
+    cursor.failing = ('IX_a_1',)
+
+    provision_indexes(CONNECTION_STRING)
+
+    # The failing index skips neither the other indexes nor the statistics
+    assert cursor.statements[1:] == [create_index_if_missing(*index) for index in INDEXES[1:]] + [
+        "UPDATE STATISTICS [db].[dbo].[a];",
+        "UPDATE STATISTICS [db].[dbo].[b];",
+    ]
@@ -1,7 +1,10 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from unittest.mock import patch
 
-from src.db_connection import SQLEngine
+from src.db_connection import SQLEngine, TimedQueuePool
 
 
 @pytest.fixture
@@ -135,4 +138,58 @@ class TestSQLEngine:
         connection_string = SQLEngine.get()
 
         expected_string = f"DRIVER={{{mock_config_data['driver']['name']}}};SERVER={mock_config_data['server']['name']};DATABASE={mock_config_data['database']['name']};UID={mock_config_data['user']['name']};PWD={self.mock_getenv.return_value}"
-        assert connection_string.url.query['odbc_connect'] == expected_string
\ No newline at end of file
+        assert connection_string.url.query['odbc_connect'] == expected_string
+
+class TestSQLEngineOptions:
+
+    def setup_method(self):
+        self.mock_config_data = {
+            'driver': {'name': 'mock_driver'},
+            'server': {'name': 'mock_server'},
+            'database': {'name': 'mock_database'},
+            'user': {'name': 'mock_user'},
+            'engine': {'pool_size': 3, 'pool_recycle': 600, 'fast_executemany': True},
+            'odbc': {'Packet Size': 32767},
+        }
+        patch('tomli.load', return_value=self.mock_config_data).start()
+        patch('os.getenv', return_value='mock_password').start()
+        self.mock_create_engine = patch('src.db_connection.create_engine').start()
+
+    def teardown_method(self, method):
+        SQLEngine.reset()
+        patch.stopall()
+
+    def test_engine_options(self):
+        SQLEngine.get()
+
+        url = self.mock_create_engine.call_args.args[0]
+        kwargs = self.mock_create_engine.call_args.kwargs
+        assert url.query['odbc_connect'].endswith(';PWD=mock_password;Packet Size=32767')
+        assert kwargs['poolclass'] is TimedQueuePool
+        assert kwargs['pool_pre_ping'] is True
+        assert kwargs['pool_size'] == 3
+        assert kwargs['pool_recycle'] == 600
+        assert kwargs['fast_executemany'] is True
+
+    def test_dispose(self):
+        engine = SQLEngine.get()
+
+        SQLEngine.dispose()
+
+        engine.dispose.assert_called_once()
+        assert SQLEngine._sql_engine is None
+        SQLEngine.get()
+        assert self.mock_create_engine.call_count == 2
+
+    def test_concurrent_get_creates_one_engine(self):
+        def slow_create_engine(*args, **kwargs):
+            # Widen the window in which another thread could create an engine
+            time.sleep(0.05)
+            return object()
+        self.mock_create_engine.side_effect = slow_create_engine
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            engines = list(executor.map(lambda _: SQLEngine.get(), range(4)))
+
+        assert self.mock_create_engine.call_count == 1
+        assert all(engine is engines[0] for engine in engines)
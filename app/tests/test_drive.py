@@ -0,0 +1,292 @@
+import hashlib
+import json
+import re
+from unittest.mock import patch
+
+import httpretty
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+
+from drive_database.drive import cache_it, download_drive_file, retrive_latest_file_by_pattern
+from src.exceptions import FileValidationError
+
+
+MEDIA_URI = re.compile(r'https://www.googleapis.com/drive/v3/files/backup-id.*')
+
+LIST_URI = re.compile(r'https://www.googleapis.com/drive/v3/files$')
+
+FILE_PATTERN = r"VatBillingSoftware_\d+_\d+\.bak"
+
+BACKUP = bytes(range(256)) * 40
+
+DRIVE_FILE = {
+    'kind': 'drive#file',
+    'mimeType': 'application/octet-stream',
+    'id': 'backup-id',
+    'name': 'VatBillingSoftware_2080_07.bak',
+    'md5Checksum': hashlib.md5(BACKUP).hexdigest(),
+    'size': str(len(BACKUP)),
+}
+
+
+class FakeMediaEndpoint:
+    """
+    Serves the backup honouring Range headers, optionally failing some requests,
+    given as {request number: status}.
+    """
+
+    def __init__(self, body: bytes, failures=None):
+        self.body = body
+        self.failures = failures or {}
+        self.ranges = []
+
+    def __call__(self, request, uri, response_headers):
+        start, end = map(int, re.match(
+            r'bytes=(\d+)-(\d+)', request.headers['range']).groups())
+        self.ranges.append((start, end))
+        if len(self.ranges) in self.failures:
+            status = self.failures[len(self.ranges)]
+            if status == 206:
+                # Partial content without any bytes
+                response_headers['content-range'] = f'bytes {start}-{end}/{len(self.body)}'
+                return status, response_headers, b''
+            return status, response_headers, b'Transient failure'
+        if start >= len(self.body):
+            return 416, response_headers, b''
+        end = min(end, len(self.body) - 1)
+        response_headers['content-range'] = f'bytes {start}-{end}/{len(self.body)}'
+        return 206, response_headers, self.body[start:end + 1]
+
+
+class FakeListEndpoint:
+    """Serves the files in pages linked by their page token."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.queries = []
+
+    def __call__(self, request, uri, response_headers):
+        self.queries.append(request.querystring)
+        page = int(request.querystring.get('pageToken', ['0'])[0])
+        body = {'files': self.pages[page]}
+        if page + 1 < len(self.pages):
+            body['nextPageToken'] = str(page + 1)
+        return 200, response_headers, json.dumps(body)
+
+
+def listed_file(name):
+    return {**DRIVE_FILE, 'id': name, 'name': name}
+
+
+@pytest.fixture(autouse=True)
+def drive_cache_path(tmp_path, monkeypatch):
+    drive_cache_path = tmp_path / 'drive_cache.json'
+    monkeypatch.setattr('drive_database.drive_cache.DRIVE_CACHE_PATH', drive_cache_path)
+    monkeypatch.setattr('drive_database.drive.DRIVE_DOWNLOAD_CHUNKSIZE', 4096)
+    monkeypatch.setattr('drive_database.drive.DRIVE_DOWNLOAD_BACKOFF', 0)
+    return drive_cache_path
+
+
+@pytest.fixture
+def credentials():
+    return Credentials(token='drive-token')
+
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    backup_dir = tmp_path / 'backup'
+    backup_dir.mkdir()
+    return backup_dir
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_download_in_chunks(credentials, backup_dir):
+    endpoint = FakeMediaEndpoint(BACKUP)
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert file_path == backup_dir / DRIVE_FILE['name']
+    assert file_path.read_bytes() == BACKUP
+    assert endpoint.ranges == [(0, 4095), (4096, 8191), (8192, 12287)]
+    assert not list(backup_dir.glob('*.part'))
+    assert httpretty.last_request().headers['authorization'] == 'Bearer drive-token'
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+@httpretty.activate(allow_net_connect=False)
+def test_download_retries_transient_errors(credentials, backup_dir, monkeypatch, status):
+    monkeypatch.setattr('drive_database.drive.DRIVE_DOWNLOAD_BACKOFF', 1)
+    endpoint = FakeMediaEndpoint(BACKUP, failures={2: status, 3: status})
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    with patch('drive_database.drive.time.sleep') as mock_sleep:
+        file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert file_path.read_bytes() == BACKUP
+    # The failed chunk is requested again from the same offset, backing off
+    assert endpoint.ranges == [(0, 4095), (4096, 8191), (4096, 8191), (4096, 8191), (8192, 12287)]
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1, 2]
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_download_retries_empty_partial_content(credentials, backup_dir):
+    endpoint = FakeMediaEndpoint(BACKUP, failures={2: 206})
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert file_path.read_bytes() == BACKUP
+    assert endpoint.ranges == [(0, 4095), (4096, 8191), (4096, 8191), (8192, 12287)]
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_download_gives_up_on_empty_partial_content(credentials, backup_dir):
+    endpoint = FakeMediaEndpoint(BACKUP, failures=dict.fromkeys(range(2, 10), 206))
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    with pytest.raises(HttpError):
+        download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    # The first request and the failing one with its 3 retries
+    assert len(endpoint.ranges) == 5
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_download_does_not_retry_client_errors(credentials, backup_dir):
+    endpoint = FakeMediaEndpoint(BACKUP, failures={2: 403})
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    with pytest.raises(HttpError):
+        download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert len(endpoint.ranges) == 2
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_download_resumes_partial_file(credentials, backup_dir):
+    # The chunk after the first keeps failing past the retries
+    endpoint = FakeMediaEndpoint(BACKUP, failures=dict.fromkeys(range(2, 6), 503))
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    with pytest.raises(HttpError):
+        download_drive_file(credentials, DRIVE_FILE, backup_dir)
+    partial_path = backup_dir / f"{DRIVE_FILE['name']}.part"
+    assert partial_path.read_bytes() == BACKUP[:4096]
+    assert not (backup_dir / DRIVE_FILE['name']).exists()
+
+    file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert file_path.read_bytes() == BACKUP
+    # The next download resumes from the end of the partial file
+    assert endpoint.ranges[5:] == [(4096, 8191), (8192, 12287)]
+    assert not partial_path.exists()
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_download_completes_finished_partial_file(credentials, backup_dir):
+    endpoint = FakeMediaEndpoint(BACKUP)
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+    (backup_dir / f"{DRIVE_FILE['name']}.part").write_bytes(BACKUP)
+
+    file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert file_path.read_bytes() == BACKUP
+    assert endpoint.ranges == [(len(BACKUP), len(BACKUP) + 4095)]
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_verified_download_is_not_hashed_again(credentials, backup_dir, drive_cache_path):
+    endpoint = FakeMediaEndpoint(BACKUP)
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+    download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    cache = json.loads(drive_cache_path.read_text())
+    assert cache['name'] == DRIVE_FILE['name']
+    assert cache['md5Checksum'] == DRIVE_FILE['md5Checksum']
+    assert cache['verified'][DRIVE_FILE['name']]['md5Checksum'] == DRIVE_FILE['md5Checksum']
+
+    with patch('drive_database.drive.hash_file') as mock_hash_file:
+        file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    mock_hash_file.assert_not_called()
+    assert file_path.read_bytes() == BACKUP
+    assert len(endpoint.ranges) == 3
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_truncated_file_is_downloaded_again(credentials, backup_dir):
+    endpoint = FakeMediaEndpoint(BACKUP)
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+    (backup_dir / DRIVE_FILE['name']).write_bytes(BACKUP[:5000])
+
+    file_path = download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert file_path.read_bytes() == BACKUP
+    assert endpoint.ranges[0] == (0, 4095)
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_corrupt_download_is_rejected(credentials, backup_dir, drive_cache_path):
+    endpoint = FakeMediaEndpoint(BACKUP[::-1])
+    httpretty.register_uri(httpretty.GET, MEDIA_URI, body=endpoint)
+
+    with pytest.raises(FileValidationError):
+        download_drive_file(credentials, DRIVE_FILE, backup_dir)
+
+    assert list(backup_dir.iterdir()) == []
+    assert not drive_cache_path.exists()
+
+
+def test_cache_it_keeps_other_contents(drive_cache_path):
+    drive_cache_path.write_text(json.dumps({'name': 'old.bak', 'extra': [1]}))
+
+    cache_it(DRIVE_FILE)
+
+    cache = json.loads(drive_cache_path.read_text())
+    assert cache['name'] == DRIVE_FILE['name']
+    assert cache['extra'] == [1]
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_latest_file_on_a_later_page(credentials):
+    endpoint = FakeListEndpoint([
+        [listed_file('VatBillingSoftware_notes.txt')],
+        [listed_file('VatBillingSoftware_2080_08.bak'), listed_file('VatBillingSoftware_2080_07.bak')],
+        [listed_file('VatBillingSoftware_2080_06.bak')],
+    ])
+    httpretty.register_uri(httpretty.GET, LIST_URI, body=endpoint)
+
+    latest_file = retrive_latest_file_by_pattern(credentials, FILE_PATTERN)
+
+    assert latest_file['name'] == 'VatBillingSoftware_2080_08.bak'
+    # The last page is never requested
+    assert len(endpoint.queries) == 2
+    query = endpoint.queries[0]
+    assert query['q'] == ["name contains 'VatBillingSoftware_' and trashed=false"]
+    assert query['fields'] == ["nextPageToken, files(kind, mimeType, id, name, md5Checksum, size)"]
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_no_matching_file(credentials):
+    endpoint = FakeListEndpoint([[listed_file('VatBillingSoftware_notes.txt')], []])
+    httpretty.register_uri(httpretty.GET, LIST_URI, body=endpoint)
+
+    assert retrive_latest_file_by_pattern(credentials, FILE_PATTERN) is None
+    assert len(endpoint.queries) == 2
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_listing_is_cached(credentials, monkeypatch):
+    endpoint = FakeListEndpoint([[listed_file('VatBillingSoftware_2080_08.bak')]])
+    httpretty.register_uri(httpretty.GET, LIST_URI, body=endpoint)
+
+    first = retrive_latest_file_by_pattern(credentials, FILE_PATTERN)
+    second = retrive_latest_file_by_pattern(credentials, FILE_PATTERN)
+    assert first == second
+    assert len(endpoint.queries) == 1
+
+    monkeypatch.setattr('drive_database.drive.DRIVE_LISTING_TTL', 0)
+    retrive_latest_file_by_pattern(credentials, FILE_PATTERN)
+    assert len(endpoint.queries) == 2
@@ -31,3 +31,26 @@ class TestFilingMonthError:
         """Test filingMonth object creation with invalid data types."""
         with pytest.raises(TypeError):
             FilingMonth('2080', '12')
+
+
+class TestFilingMonthFiscalYear:
+    """Tests for the filing months of a fiscal year."""
+
+    def test_whole_fiscal_year(self):
+        filing_months = FilingMonth.from_fiscal_year(2080)
+
+        assert [(fm.year, fm.month) for fm in filing_months] == [
+            (2080, 4), (2080, 5), (2080, 6), (2080, 7), (2080, 8), (2080, 9),
+            (2080, 10), (2080, 11), (2080, 12), (2081, 1), (2081, 2), (2081, 3)]
+        assert {fm.get_fiscal_year() for fm in filing_months} == {"2080/81"}
+
+    def test_month_range_across_new_year(self):
+        filing_months = FilingMonth.from_fiscal_year(2080, (11, 2))
+
+        assert [(fm.year, fm.month) for fm in filing_months] == [
+            (2080, 11), (2080, 12), (2081, 1), (2081, 2)]
+
+    @pytest.mark.parametrize("months", [(2, 11), (0, 3), (4, 13)])
+    def test_invalid_month_range(self, months):
+        with pytest.raises(ValueError):
+            FilingMonth.from_fiscal_year(2080, months)
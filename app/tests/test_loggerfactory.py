@@ -1,4 +1,6 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler
 from unittest.mock import patch, Mock
 from logging import Logger
 import pytest
@@ -100,3 +102,46 @@ def test_logger_level(custom_cfg_path):
 
     # Assert that the logger has the expected logging level configured
     assert logger.level == logging.DEBUG
+
+
+@patch("src.loggerfactory.logging.config.dictConfig")
+def test_logger_factory_configures_once(mock_dict_config, custom_cfg_path):
+    logger1 = LoggerFactory.get_logger("configured_once", custom_cfg_path)
+    logger2 = LoggerFactory.get_logger("configured_once", custom_cfg_path)
+    LoggerFactory.get_logger("configured_once_other", custom_cfg_path)
+
+    assert logger1 is logger2
+    mock_dict_config.assert_called_once()
+
+
+@pytest.fixture
+def root_handlers():
+    # Keep the queue handler from swallowing the records of the later tests
+    root = logging.getLogger()
+    handlers = root.handlers.copy()
+    yield
+    LoggerFactory.stop_queue()
+    root.handlers = handlers
+
+
+def test_logger_queue(custom_cfg_path, root_handlers):
+    with patch("src.loggerfactory.LOG_QUEUE", True):
+        logger = LoggerFactory.get_logger("queued_logger", custom_cfg_path)
+    handlers = logging.getLogger().handlers
+    assert len(handlers) == 1
+    assert isinstance(handlers[0], QueueHandler)
+    assert any(isinstance(handler, logging.StreamHandler)
+               for handler in LoggerFactory._LISTENER.handlers)
+
+    logger.info("Queued record")
+    LoggerFactory.stop_queue()
+    assert LoggerFactory._LISTENER is None
+
+
+def test_concurrent_loggers():
+    names = [f"concurrent_logger_{index}" for index in range(50)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        loggers = list(executor.map(LoggerFactory.get_logger, names))
+
+    assert [logger.name for logger in loggers] == names
@@ -1,9 +1,10 @@
+import pandas as pd
 import pytest
 from io import BytesIO
 from unittest.mock import patch
 
 from src.books import Books
-from src.one_lakh_plus_transactions import LakhBusters, TransactionAbove1L
+from src.one_lakh_plus_transactions import LakhBusters, TransactionAbove1L, aggregate_transactions_above_1L
 
 
 # Arrange a test directory
@@ -83,3 +84,43 @@ def test_save_filepath_generation(lakh_busters, test_work_dir):
 
     # Assert
     assert save_filepath == test_work_dir.joinpath("transactions_above_1L.xls")
+
+
+def test_aggregate_transactions_above_1L():
+    transactions = pd.DataFrame({
+        "Bill Receiveable Person": ["ABC Inn", "ABC Inn", "John Doe", "Cash"],
+        "Vat Pan No": [123, 123, 567, ''],
+        "Grand Total": [60_000, 50_000, 90_000, 5_00_000],
+        "Taxable Amount": [53097.35, 44247.79, 79646.02, 442477.88],
+    })
+
+    result = aggregate_transactions_above_1L(transactions, 'S')
+
+    assert result.columns.tolist() == list(TransactionAbove1L._fields)
+    assert result.to_dict('records') == [{
+        'pan_no': 123,
+        'bill_receiveable_person': 'ABC Inn',
+        'trade_name_type': 'E',
+        'transaction_type': 'S',
+        'taxable_amount': 53097.35 + 44247.79,
+        'exempted_amount': 0,
+    }]
+
+
+def test_save_concatenates_frames(lakh_busters, test_work_dir):
+    headers = ["PAN", "Name", "Trade Name Type", "Purchase/Sales", "Taxable Amount", "Exempted Amount"]
+    lakh_busters.buffer = BytesIO()
+    pd.DataFrame(columns=headers).to_excel(lakh_busters.buffer, index=False)
+    lakh_busters.save_filepath = test_work_dir / "transactions_above_1L.xlsx"
+
+    lakh_busters.reset_busters()
+    lakh_busters.update_lakh_busters_frame(pd.DataFrame(
+        [["PAN5", "Person5", "E", "S", 5000.0, 0]], columns=TransactionAbove1L._fields))
+    lakh_busters.update_lakh_busters(
+        [TransactionAbove1L("PAN6", "Person6", "E", "P", 6000.0, 0)])
+    lakh_busters.save()
+
+    saved = pd.read_excel(lakh_busters.save_filepath)
+    assert saved.columns.tolist() == headers
+    assert saved["PAN"].tolist() == ["PAN5", "PAN6"]
+    assert saved["Purchase/Sales"].tolist() == ["S", "P"]
@@ -0,0 +1,91 @@
+import pytest
+
+from src.configurations import get_delta_filter, get_sql
+from src.queries import add_delta_filter, create_index_if_missing, filter_transaction_types, select_into
+
+
+def test_filter_transaction_types():
+    sql_query = "SELECT * FROM t WHERE t.[Transaction Type] = ? AND t.[Bill Date] BETWEEN ? AND ?"
+
+    batch_query = filter_transaction_types(sql_query, 2)
+
+    assert batch_query == "SELECT * FROM t WHERE t.[Transaction Type] IN (?, ?) AND t.[Bill Date] BETWEEN ? AND ?"
+
+
+def test_filter_transaction_types_without_filter():
+    with pytest.raises(ValueError):
+        filter_transaction_types("SELECT * FROM t", 2)
+
+
+@pytest.mark.parametrize("materialized", [False, True])
+def test_filter_transaction_types_runtime_queries(materialized):
+    batch_query = filter_transaction_types(get_sql(materialized=materialized), 3)
+
+    assert "[Transaction Type] IN (?, ?, ?)" in batch_query
+
+
+def test_create_index_if_missing():
+    statement = create_index_if_missing(
+        '[db].[dbo].[t]', 'IX_t', ['[Transaction Type]', '[Bill Date]'], ['Status'])
+
+    assert statement == (
+        "IF NOT EXISTS (SELECT 1 FROM [db].sys.indexes "
+        "WHERE name = 'IX_t' AND object_id = OBJECT_ID('[db].[dbo].[t]'))\n"
+        "    CREATE NONCLUSTERED INDEX [IX_t] ON [db].[dbo].[t] ([Transaction Type], [Bill Date]) INCLUDE (Status);"
+    )
+
+
+def test_create_index_if_missing_without_include():
+    statement = create_index_if_missing('t', 'IX_t', ['[Transaction ID]'])
+
+    assert "FROM sys.indexes" in statement
+    assert statement.endswith("ON t ([Transaction ID]);")
+
+
+def test_add_delta_filter():
+    sql_query = "SELECT * FROM t WHERE t.[Transaction Type] = ? AND t.[Bill Date] BETWEEN ? AND ? ORDER BY 1"
+
+    delta_query = add_delta_filter(sql_query, "t.[Transaction ID] > ?\n")
+
+    assert delta_query == ("SELECT * FROM t WHERE t.[Transaction Type] = ? "
+                           "AND t.[Bill Date] BETWEEN ? AND ? AND (t.[Transaction ID] > ?) ORDER BY 1")
+
+
+def test_add_delta_filter_without_date_range():
+    with pytest.raises(ValueError):
+        add_delta_filter("SELECT * FROM t", "a > ?")
+
+
+@pytest.mark.parametrize("materialized", [False, True])
+def test_add_delta_filter_runtime_queries(materialized):
+    delta_query = add_delta_filter(
+        get_sql(materialized=materialized), get_delta_filter(materialized=materialized))
+
+    assert delta_query.count("?") == 5
+
+
+def test_select_into():
+    sql_query = (
+        "SELECT t.a, STRING_AGG(t.b, '/') WITHIN GROUP (ORDER BY t.b) as 'B'\n"
+        "FROM t\n"
+        "WHERE t.[Transaction Type] = ?\n"
+        "    AND t.[Bill Date] BETWEEN ? AND ?\n"
+        "GROUP BY t.a\n"
+        "ORDER BY t.a;\n"
+    )
+
+    statement = select_into(sql_query, "[db].[dbo].[r]")
+
+    assert statement == (
+        "SELECT t.a, STRING_AGG(t.b, '/') WITHIN GROUP (ORDER BY t.b) as 'B'\n"
+        "INTO [db].[dbo].[r]\n"
+        "FROM t\n"
+        "WHERE 1 = 1\n"
+        "    AND 1 = 1\n"
+        "GROUP BY t.a;"
+    )
+
+
+def test_select_into_without_filters():
+    with pytest.raises(ValueError):
+        select_into("SELECT *\nFROM t WHERE t.[Bill Date] BETWEEN ? AND ?", "r")
@@ -1,3 +1,5 @@
+from copy import copy
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import Mock, patch
 from openpyxl import load_workbook
@@ -5,8 +7,10 @@ import pandas as pd
 import pytest
 from io import BytesIO
 from src.books import Book, BookColumns, EmptyColumns
+from src.configurations import CompanyDetails
 from src.one_lakh_plus_transactions import TransactionAbove1L
 from src.report import Report
+from src.transaction_cache import TransactionCache, Watermark, get_watermark
 from src.filingmonth import FilingMonth
 
 
@@ -74,7 +78,9 @@ def mock_sql_engine(monkeymodule):
 
 @pytest.fixture(scope="function")
 def mock_get_data(monkeymodule):
-    monkeymodule.setattr('src.report.get_data', lambda x: mock_data[x])
+    monkeymodule.setattr('src.report.get_sql', lambda: mock_data['sql'])
+    monkeymodule.setattr('src.report.get_company_details',
+                         lambda: CompanyDetails(mock_data['details']['PAN'], mock_data['details']['office_name']))
 
 
 @pytest.fixture
@@ -145,6 +151,8 @@ def test_remove_cancelled_transactions_removes_correctly(test_report, mock_db_tr
     # Call the function to remove cancelled transactions
     filtered_df = test_report.remove_cancelled_transactions(df.copy())
 
+    assert test_report.cancelled_transactions == ["T1", "T3"]
+
     assert isinstance(filtered_df, pd.DataFrame)
 
     # Assert that only non-cancelled transactions remain
@@ -192,6 +200,84 @@ def test_query_db(
     )
 
 
+@patch('src.report.pd.read_sql')
+def test_query_db_chunked(
+    mock_read_sql,
+    test_report,
+    book_instance,
+    mock_db_transactions,
+    mock_raw_transactions,
+):
+    mock_db_transactions['Total w Round'] = mock_db_transactions['Grand Total']
+    mock_db_transactions['Round Off'] = 0
+    mock_db_transactions['Bill Date'] = pd.to_datetime(
+        ["2023-10-18", "2023-10-19", "2023-10-20", "2023-10-21"])
+    mock_db_transactions['Transaction Type'] = book_instance.id
+    mock_read_sql.return_value = iter(
+        [mock_db_transactions.iloc[:3], mock_db_transactions.iloc[3:]])
+    test_report.chunksize = 3
+
+    raw_transactions = test_report.query_db()
+
+    assert mock_read_sql.call_args.kwargs['chunksize'] == 3
+    assert raw_transactions.columns.tolist() == book_instance.columns.column_names + [
+        'Total w Round', 'Round Off', 'Bill Date', 'Transaction Type']
+    assert raw_transactions['Transaction ID'].tolist() == ["T2", "T4"]
+    # Snapshots of streamed results keep their watermark for incremental queries
+    assert get_watermark(raw_transactions) == Watermark("T4", datetime(2023, 10, 21))
+    assert test_report.cancelled_transactions == ["T1", "T3"]
+
+
+@patch('src.report.pd.read_sql')
+def test_raw_transactions_snapshot_cache(mock_read_sql, test_report, tmp_path, mock_db_transactions):
+    mock_read_sql.return_value = mock_db_transactions
+    test_report.cache = TransactionCache("backup.bak", tmp_path / "cache")
+
+    first = test_report.raw_transactions
+
+    cached_report = Report(test_report.book, test_report.filing_month, tmp_path)
+    cached_report.cache = test_report.cache
+    second = cached_report.raw_transactions
+
+    mock_read_sql.assert_called_once()
+    pd.testing.assert_frame_equal(first, second)
+    assert cached_report.cancelled_transactions == ["T1", "T3"]
+
+
+@patch('src.report.pd.read_sql')
+def test_load_incremental_transactions(mock_read_sql, test_report, tmp_path, monkeypatch):
+    monkeypatch.setattr('src.report.get_delta_filter', lambda: "[Transaction ID] > ? OR [Bill Date] > ?")
+    monkeypatch.setattr('src.report.get_sql', lambda: "SELECT * FROM t WHERE [Bill Date] BETWEEN ? AND ?")
+    snapshot = pd.DataFrame({
+        "Transaction ID": [1, 2, 3],
+        "Bill Date": pd.to_datetime(["2023-10-18", "2023-10-19", "2023-10-20"]),
+        "Grand Total": [100.0, 200.0, 300.0],
+    })
+    TransactionCache("backup_1.bak", tmp_path / "cache").write(
+        test_report.book.id, test_report.date_range, snapshot, [7])
+    test_report.cache = TransactionCache("backup_2.bak", tmp_path / "cache")
+    test_report.incremental = True
+    # Transaction 2 is amended, 3 is cancelled and 4 is new
+    mock_read_sql.return_value = pd.DataFrame({
+        "Transaction ID": [2, 3, 4],
+        "Bill Date": pd.to_datetime(["2023-10-19", "2023-10-20", "2023-10-19"]),
+        "Grand Total": [250.0, 300.0, 400.0],
+        "Status": ["001-01", "001-03", "001-01"],
+        "Modify Type": ["Update", "Cancel", None],
+    })
+
+    raw_transactions = test_report.raw_transactions
+
+    assert mock_read_sql.call_args.args[0] == \
+        "SELECT * FROM t WHERE [Bill Date] BETWEEN ? AND ? AND ([Transaction ID] > ? OR [Bill Date] > ?)"
+    assert mock_read_sql.call_args.kwargs['params'][3:] == (3, datetime(2023, 10, 20))
+    assert raw_transactions["Transaction ID"].tolist() == [1, 2, 4]
+    assert raw_transactions["Grand Total"].tolist() == [100.0, 250.0, 400.0]
+    assert test_report.cancelled_transactions == [7, 3]
+    # The merged transactions are snapshotted for the restored backup
+    assert test_report.cache.read(test_report.book.id, test_report.date_range) is not None
+
+
 def test_process_transactions(test_report, mock_raw_transactions, mock_transactions):
 
     test_report._raw_transactions = mock_raw_transactions
@@ -207,6 +293,36 @@ def test_process_transactions(test_report, mock_raw_transactions, mock_transacti
     )
 
 
+def test_process_transactions_missing_pans(test_report, mock_raw_transactions):
+    mock_raw_transactions['Vat Pan No'] = pd.Series(
+        ['234', ''], index=mock_raw_transactions.index, dtype=object)
+    test_report._raw_transactions = mock_raw_transactions
+
+    # Test
+    result = test_report.process_transactions()
+
+    # Assert
+    assert result.columns.tolist() == [
+        "Transaction ID", 1, "Bill Receiveable Person", "Vat Pan No", "Grand Total", "Taxable Amount"]
+    assert result[1].tolist() == [None, None]
+    assert result['Vat Pan No'].tolist() == [234, '']
+    assert type(result['Vat Pan No'].iloc[0]) is int
+
+
+@pytest.mark.parametrize("pans", [
+    pd.Series([234.0, float('nan')]),
+    pd.Series([234, None], dtype=object),
+])
+def test_process_transactions_null_pans(test_report, mock_raw_transactions, pans):
+    mock_raw_transactions['Vat Pan No'] = pans.set_axis(mock_raw_transactions.index)
+    test_report._raw_transactions = mock_raw_transactions
+
+    result = test_report.process_transactions()
+
+    assert result['Vat Pan No'].tolist() == [234, '']
+    assert type(result['Vat Pan No'].iloc[0]) is int
+
+
 def test_fill_report_details(test_report, saved_mock_get_template_buffer):
     # Test
     test_report.fill_report_details()
@@ -217,14 +333,8 @@ def test_fill_report_details(test_report, saved_mock_get_template_buffer):
     assert sheet['A4'].value == 'करदाता दर्ता नं (PAN) : 1234567890        करदाताको नाम: test_office         साल: 2080    कर अवधि: Kartik'
 
 
-def test_populate_report_buffer(test_report, mock_transactions, saved_mock_get_template_buffer, monkeypatch):
-    # Mocking fill_report_details for simplicity
-    monkeypatch.setattr(
-        "src.report.Report.fill_report_details", lambda x: None)
-    test_report.buffer = test_report.get_template_buffer()
-
+def test_populate_report_buffer(test_report, mock_transactions, saved_mock_get_template_buffer):
     test_report._transactions = mock_transactions
-    # test_report.fill_report_details()
 
     # Test
     test_report.populate_report_buffer()
@@ -232,9 +342,30 @@ def test_populate_report_buffer(test_report, mock_transactions, saved_mock_get_t
     sheet = workbook.active
 
     # Assert
+    assert sheet['A4'].value.startswith('करदाता दर्ता नं (PAN) : 1234567890')
     assert sheet['A7'].value == 'T2'
     assert sheet['B7'].value == None
     assert sheet['C7'].value == 'Sajha ban'
+    assert sheet['D7'].value == 234
+    assert sheet['F8'].value == 176991.15
+    assert sheet.max_row == 8
+
+
+def test_populate_report_buffer_matches_overlay(test_report, mock_transactions, saved_mock_get_template_buffer):
+    """The single-pass writer matches the former read_excel/ExcelWriter overlay."""
+    test_report._transactions = mock_transactions
+    test_report.fill_report_details()
+    reader = pd.read_excel(test_report.buffer, engine='openpyxl')
+    with pd.ExcelWriter(test_report.buffer, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
+        mock_transactions.to_excel(
+            writer, index=False, header=False, sheet_name='Nepali SB', startrow=len(reader) + 1)
+    expected = pd.read_excel(test_report.buffer, header=None)
+
+    test_report.buffer = BytesIO()
+    saved_mock_get_template_buffer.seek(0)
+    test_report.populate_report_buffer()
+
+    pd.testing.assert_frame_equal(pd.read_excel(test_report.buffer, header=None), expected)
 
 
 def test_save(test_report, monkeypatch):
@@ -268,3 +399,80 @@ def test_get_transactions_above_1L(test_report, mock_transactions):
 
     # Perform the assertion
     assert result == expected_result
+
+
+def test_process_cancelled_transactions(test_report, mock_db_transactions):
+    mock_db_transactions['Total w Round'] = mock_db_transactions['Grand Total']
+    mock_db_transactions['Tax Amount'] = 0.0
+
+    result = test_report.process_cancelled_transactions(mock_db_transactions)
+
+    assert result.shape[0] == 4
+    assert result.loc[[0, 2], 'Grand Total'].tolist() == ['-', '-']
+    assert result.loc[[1, 3], 'Grand Total'].tolist() == [2_000, 2_00_000]
+    assert test_report.cancelled_transactions == ["T1", "T3"]
+
+
+def test_save_records_timings(test_report, monkeypatch):
+    monkeypatch.setattr(
+        'src.report.Report.populate_report_buffer', lambda _: None)
+
+    with patch('src.report.write_bytes_to_disk', Mock()):
+        test_report.save()
+
+    assert set(test_report.timings) == {'write'}
+    assert test_report.timings['write'] >= 0
+
+
+def test_populate_report_buffer_write_only(test_report, mock_transactions, saved_mock_get_template_buffer):
+    test_report._transactions = mock_transactions
+    test_report.write_only = True
+
+    # Test
+    test_report.populate_report_buffer()
+    workbook = load_workbook(test_report.buffer)
+    sheet = workbook.active
+    template = load_workbook(saved_mock_get_template_buffer).active
+
+    # Assert
+    assert sheet.title == 'Nepali SB'
+    assert sheet['A4'].value.startswith('करदाता दर्ता नं (PAN) : 1234567890')
+    assert sheet['A5'].value == template['A5'].value
+    assert copy(sheet['A5'].font) == copy(template['A5'].font)
+    assert copy(sheet['A5'].border) == copy(template['A5'].border)
+    assert sheet.merged_cells.ranges == template.merged_cells.ranges
+    assert sheet.column_dimensions['C'].width == template.column_dimensions['C'].width
+    assert sheet['A7'].value == 'T2'
+    assert sheet['B7'].value == None
+    assert sheet['C7'].value == 'Sajha ban'
+    assert sheet['F8'].value == 176991.15
+    assert sheet.max_row == 8
+
+
+def test_populate_report_buffer_write_only_keeps_sheet_settings(
+        test_report, mock_transactions, saved_mock_get_template_buffer):
+    template = load_workbook(saved_mock_get_template_buffer)
+    # The book sheet is not the active one of this template
+    template.create_sheet('Notes', 0)
+    template.active = 0
+    template_sheet = template['Nepali SB']
+    template_sheet.freeze_panes = 'A7'
+    template_sheet.print_title_rows = '1:6'
+    template_sheet.page_setup.orientation = 'landscape'
+    template_sheet.oddHeader.center.text = 'VAT report'
+    template_buffer = BytesIO()
+    template.save(template_buffer)
+    test_report._transactions = mock_transactions
+    test_report.write_only = True
+
+    with patch('src.report.Report.get_template_buffer', return_value=template_buffer):
+        test_report.populate_report_buffer()
+    workbook = load_workbook(test_report.buffer)
+    sheet = workbook['Nepali SB']
+
+    assert sheet['A4'].value.startswith('करदाता दर्ता नं (PAN) : 1234567890')
+    assert sheet.freeze_panes == 'A7'
+    assert sheet.print_title_rows == '$1:$6'
+    assert sheet.page_setup.orientation == 'landscape'
+    assert sheet.oddHeader.center.text == 'VAT report'
+    assert sheet['A7'].value == 'T2'
@@ -1,7 +1,9 @@
+import pandas as pd
 import pytest
 from unittest.mock import Mock
+from src.books import Books
 from src.one_lakh_plus_transactions import LakhBusters
-from src.report_generator import ReportGenerator, Book, FilingMonth, Report
+from src.report_generator import ReportGenerator, Book, FilingMonth, Report, partition_by_month
 
 
 @pytest.fixture
@@ -61,3 +63,204 @@ def test_get_report(filing_month):
 
     # Assert
     assert report == expected_report
+
+
+def test_generate_with_batch_fetch(filing_month, monkeypatch, capsys):
+    # Arrange
+    report_generator = ReportGenerator(filing_month, batch_fetch=True)
+    reports = {1: Mock(spec=Report), 2: Mock(spec=Report)}
+    for report in reports.values():
+        report.timings = {}
+        report.read_cached_transactions.return_value = False
+        report.load_incremental_transactions.return_value = False
+    transactions = {1: Mock(), 2: Mock()}
+    mock_fetch = Mock(return_value=transactions)
+
+    monkeypatch.setattr(ReportGenerator, 'lakh_busters', Mock(spec=LakhBusters))
+    monkeypatch.setattr(report_generator, 'fetch_transactions', mock_fetch)
+    monkeypatch.setattr(report_generator, 'get_report',
+                        lambda book: reports[book.id])
+
+    # Act
+    report_generator.generate(None)
+
+    # Assert
+    mock_fetch.assert_called_once()
+    for book_id, report in reports.items():
+        report.load_raw_transactions.assert_called_once_with(
+            transactions[book_id])
+        report.save.assert_called_once()
+        assert 'query' in report.timings
+    # The batched query is timed once for all books
+    assert list(report_generator.timings) == ['batch query']
+    assert "Shared timings: batch query: " in capsys.readouterr().out
+
+
+def test_generate_with_batch_fetch_skips_cached_books(filing_month, monkeypatch):
+    # Arrange
+    report_generator = ReportGenerator(filing_month, batch_fetch=True)
+    reports = {1: Mock(spec=Report), 2: Mock(spec=Report)}
+    reports[1].read_cached_transactions.return_value = False
+    reports[1].load_incremental_transactions.return_value = False
+    reports[2].read_cached_transactions.return_value = True
+    for report in reports.values():
+        report.timings = {}
+    transactions = {1: Mock()}
+    mock_fetch = Mock(return_value=transactions)
+
+    monkeypatch.setattr(ReportGenerator, 'lakh_busters', Mock(spec=LakhBusters))
+    monkeypatch.setattr(report_generator, 'fetch_transactions', mock_fetch)
+    monkeypatch.setattr(report_generator, 'get_report',
+                        lambda book: reports[book.id])
+
+    # Act
+    report_generator.generate(None)
+
+    # Assert
+    assert mock_fetch.call_args.args[0] == [Books.PURCHASE.value]
+    reports[1].load_raw_transactions.assert_called_once_with(transactions[1])
+    reports[2].load_raw_transactions.assert_not_called()
+
+
+def test_fetch_transactions(filing_month, monkeypatch):
+    # Arrange
+    report_generator = ReportGenerator(filing_month)
+    dataframe = pd.DataFrame({
+        "Transaction ID": ["T1", "T2", "T3"],
+        "Transaction Type": [2, 1, 2],
+    })
+    mock_read_sql = Mock(return_value=dataframe)
+    monkeypatch.setattr('src.report_generator.pd.read_sql', mock_read_sql)
+    monkeypatch.setattr('src.report_generator.SQLEngine.get', Mock())
+    monkeypatch.setattr('src.report_generator.get_sql',
+                        lambda: "SELECT * FROM t WHERE t.[Transaction Type] = ? AND d BETWEEN ? AND ?")
+
+    # Act
+    transactions = report_generator.fetch_transactions(
+        (Books.SALES.value, Books.PURCHASE.value))
+
+    # Assert
+    date_range = filing_month.get_AD_date_range()
+    assert mock_read_sql.call_args.args[0] == \
+        "SELECT * FROM t WHERE t.[Transaction Type] IN (?, ?) AND d BETWEEN ? AND ?"
+    assert mock_read_sql.call_args.kwargs['params'] == (
+        2, 1, date_range.start, date_range.end)
+    assert transactions[2]["Transaction ID"].tolist() == ["T1", "T3"]
+    assert transactions[1]["Transaction ID"].tolist() == ["T2"]
+
+
+def test_generate_concurrently(filing_month, monkeypatch):
+    # Arrange
+    report_generator = ReportGenerator(filing_month, concurrent=True)
+    reports = {1: Mock(spec=Report), 2: Mock(spec=Report)}
+    for book_id, report in reports.items():
+        report.get_transactions_above_1L_frame.return_value = [book_id]
+    mock_lakh_busters = Mock(spec=LakhBusters)
+
+    monkeypatch.setattr(ReportGenerator, 'lakh_busters', mock_lakh_busters)
+    monkeypatch.setattr(report_generator, 'get_report',
+                        lambda book: reports[book.id])
+
+    # Act
+    report_generator.generate(None)
+
+    # Assert
+    for report in reports.values():
+        report.save.assert_called_once()
+        report.print_timings.assert_called_once()
+    # Sales first, then purchase
+    assert [call.args[0] for call in mock_lakh_busters.update_lakh_busters_frame.call_args_list] == [
+        [2], [1]]
+    mock_lakh_busters.save.assert_called_once()
+
+
+def test_partition_by_month():
+    filing_months = FilingMonth.from_fiscal_year(2080, (4, 6))
+    date_ranges = [filing_month.get_AD_date_range() for filing_month in filing_months]
+    dataframe = pd.DataFrame({
+        "Transaction ID": [1, 2, 3, 4, 5],
+        "Bill Date": pd.to_datetime([
+            date_ranges[2].end, date_ranges[0].start, date_ranges[0].end,
+            date_ranges[1].start, date_ranges[2].start]),
+    })
+
+    partitions = partition_by_month(dataframe, date_ranges)
+
+    assert [partition["Transaction ID"].tolist() for partition in partitions] == [
+        [2, 3], [4], [5, 1]]
+
+
+def test_partition_by_month_with_dates():
+    filing_months = FilingMonth.from_fiscal_year(2080, (4, 5))
+    date_ranges = [filing_month.get_AD_date_range() for filing_month in filing_months]
+    # pyodbc returns a SQL date column as datetime.date objects
+    dataframe = pd.DataFrame({
+        "Transaction ID": [1, 2, 3],
+        "Bill Date": pd.Series(
+            [date_ranges[1].start, date_ranges[0].end, date_ranges[0].start], dtype=object),
+    })
+
+    partitions = partition_by_month(dataframe, date_ranges)
+
+    assert [partition["Transaction ID"].tolist() for partition in partitions] == [[3, 2], [1]]
+    # The bill dates are left as they were queried
+    assert partitions[1]["Bill Date"].tolist() == [date_ranges[1].start]
+
+
+def test_generate_fiscal_year(monkeypatch):
+    # Arrange
+    report_generator = ReportGenerator(FilingMonth(2081, 2))
+    filing_months = FilingMonth.from_fiscal_year(2080)
+    year_start = filing_months[0].get_AD_date_range().start
+    year_end = filing_months[-1].get_AD_date_range().end
+    transactions = {
+        book_id: pd.DataFrame({
+            "Transaction ID": [book_id, book_id + 10],
+            "Bill Date": pd.to_datetime([year_start, year_end]),
+        })
+        for book_id in (1, 2)
+    }
+    mock_fetch = Mock(return_value=transactions)
+    reports = []
+
+    def get_report(self, book):
+        report = Mock(spec=Report)
+        report.filing_month = self.filingMonth
+        report.book = book
+        report.transactions = pd.DataFrame({
+            "Vat Pan No": [600000001],
+            "Bill Receiveable Person": ["ABC Inn"],
+            "Taxable Amount": [60_000],
+            "Grand Total": [67_800],
+        })
+        reports.append(report)
+        return report
+
+    mock_lakh_busters = Mock(spec=LakhBusters)
+    monkeypatch.setattr('src.report_generator.LakhBusters', mock_lakh_busters)
+    monkeypatch.setattr(report_generator, 'fetch_transactions', mock_fetch)
+    monkeypatch.setattr(ReportGenerator, 'get_report', get_report)
+
+    # Act
+    report_generator.generate_fiscal_year(None)
+
+    # Assert
+    mock_fetch.assert_called_once()
+    date_range = mock_fetch.call_args.args[1]
+    assert (date_range.start, date_range.end) == (year_start, year_end)
+    assert len(reports) == 24
+    for report in reports:
+        report.save.assert_called_once()
+        loaded = report.load_raw_transactions.call_args.args[0]["Transaction ID"].tolist()
+        if report.filing_month.month == 4:
+            assert loaded == [report.book.id]
+        elif report.filing_month.month == 3:
+            assert loaded == [report.book.id + 10]
+        else:
+            assert loaded == []
+    # 12 months of 67,800 add up above 1L for each book
+    assert mock_lakh_busters.call_args.args[0] == report_generator.work_dir.parent
+    frames = [call.args[0] for call in mock_lakh_busters.return_value.update_lakh_busters_frame.call_args_list]
+    assert [frame["transaction_type"].tolist() for frame in frames] == [["S"], ["P"]]
+    assert [frame["taxable_amount"].tolist() for frame in frames] == [[720_000], [720_000]]
+    mock_lakh_busters.return_value.save.assert_called_once()
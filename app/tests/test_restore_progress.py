@@ -0,0 +1,83 @@
+import json
+from unittest.mock import patch
+
+from drive_database.drive_cache import record_restore, update_latest_restore
+from drive_database.restore_progress import RestoreStats, log_restore_messages
+
+
+PREFIX = "[Microsoft][ODBC Driver 17 for SQL Server][SQL Server]"
+
+
+class FakeCursor:
+    """Serves the messages of a restore, one result set at a time."""
+
+    def __init__(self, result_sets):
+        self.result_sets = result_sets
+        self.messages = result_sets.pop(0)
+
+    def nextset(self):
+        if not self.result_sets:
+            self.messages = []
+            return False
+        self.messages = self.result_sets.pop(0)
+        return True
+
+
+def test_log_restore_messages():
+    cursor = FakeCursor([
+        [('[01000] (3211)', f"{PREFIX}10 percent processed.")],
+        [('[01000] (3211)', f"{PREFIX}100 percent processed.")],
+        [
+            ('[01000] (4035)', f"{PREFIX}Processed 4168 pages for database 'VatBillingSoftware', file 'VatBillingSoftware' on file 1."),
+            ('[01000] (3014)', f"{PREFIX}RESTORE DATABASE successfully processed 4178 pages in 0.517 seconds (63.118 MB/sec)."),
+        ],
+    ])
+
+    with patch('drive_database.restore_progress.logger') as mock_logger:
+        stats = log_restore_messages(cursor)
+
+    assert stats == RestoreStats(4178, 0.517, 63.118)
+    *progress, completed = mock_logger.info.call_args_list
+    assert [call.kwargs['extra'] for call in progress] == [
+        {'restore_percent': 10}, {'restore_percent': 100}]
+    assert completed.kwargs['extra'] == {
+        'restore_stats': {'pages': 4178, 'seconds': 0.517, 'mb_per_sec': 63.118}}
+    mock_logger.debug.assert_called_once_with(
+        "Processed 4168 pages for database 'VatBillingSoftware', file 'VatBillingSoftware' on file 1.")
+
+
+def test_log_restore_messages_without_stats():
+    assert log_restore_messages(FakeCursor([[]])) is None
+
+
+def test_record_restore(tmp_path, monkeypatch):
+    drive_cache_path = tmp_path / 'drive_cache.json'
+    drive_cache_path.write_text(json.dumps({'name': 'VatBillingSoftware_2080_07.bak'}))
+    monkeypatch.setattr('drive_database.drive_cache.DRIVE_CACHE_PATH', drive_cache_path)
+    monkeypatch.setattr('drive_database.drive_cache.RESTORE_HISTORY_LENGTH', 2)
+
+    for index in range(3):
+        record_restore(f'backup_{index}.bak', 60.12345, 50.5, f'md5_{index}')
+
+    cache = json.loads(drive_cache_path.read_text())
+    assert cache['name'] == 'VatBillingSoftware_2080_07.bak'
+    assert [restore['name'] for restore in cache['restore_history']] == ['backup_1.bak', 'backup_2.bak']
+    assert cache['restore_history'][-1]['duration'] == 60.123
+    assert cache['restore_history'][-1]['md5Checksum'] == 'md5_2'
+    assert cache['restore_history'][-1]['mb_per_sec'] == 50.5
+
+
+def test_update_latest_restore(tmp_path, monkeypatch):
+    drive_cache_path = tmp_path / 'drive_cache.json'
+    monkeypatch.setattr('drive_database.drive_cache.DRIVE_CACHE_PATH', drive_cache_path)
+
+    # Without a restore there is nothing to update
+    update_latest_restore({'report_table': True})
+    assert not drive_cache_path.exists()
+
+    record_restore('backup_1.bak', 60.0)
+    record_restore('backup_2.bak', 60.0)
+    update_latest_restore({'report_table': True})
+
+    history = json.loads(drive_cache_path.read_text())['restore_history']
+    assert [restore.get('report_table') for restore in history] == [None, True]
@@ -0,0 +1,178 @@
+import json
+import re
+import subprocess
+import sys
+import time
+from time import perf_counter
+from types import SimpleNamespace
+
+import pytest
+import run
+from settings import PACKAGE_PATH
+
+
+# Cold start budget from interpreter start to the first menu render (in seconds)
+STARTUP_BUDGET = 1.5
+
+# Modules which must not be imported before the menu is shown
+HEAVY_MODULES = ('pandas', 'openpyxl', 'googleapiclient', 'google.oauth2', 'pyodbc', 'sqlalchemy')
+
+STARTUP_SCRIPT = "import run; run.build_menu().display_welcome_message()"
+
+
+def run_startup() -> subprocess.CompletedProcess:
+    """Renders the main menu in a fresh interpreter with import timings on stderr."""
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=PACKAGE_PATH,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def test_startup_renders_menu():
+    result = run_startup()
+
+    assert result.returncode == 0, result.stderr
+    assert "### Report Generator ###" in result.stdout
+
+
+def test_startup_skips_heavy_modules():
+    result = run_startup()
+
+    imported = set(re.findall(r"^import time:.*\|\s*([\w.]+)$", result.stderr, re.MULTILINE))
+    assert imported, result.stderr
+    assert not imported.intersection(HEAVY_MODULES)
+
+
+def test_startup_within_budget():
+    start = perf_counter()
+    result = run_startup()
+    elapsed = perf_counter() - start
+
+    # Cumulative import time of run.py in microseconds, reported on failure
+    cumulative = re.search(r"^import time:\s*\d+ \|\s*(\d+) \| run$", result.stderr, re.MULTILINE)
+    assert cumulative, result.stderr
+    assert elapsed < STARTUP_BUDGET, (
+        f"Menu rendered after {elapsed:.3f}s, importing run took {int(cumulative.group(1)) / 1_000_000:.3f}s")
+
+
+@pytest.fixture
+def drive_cache(tmp_path, monkeypatch):
+    """Points drive_cache.json to a temporary file, returning its path."""
+    cache_path = tmp_path / 'drive_cache.json'
+    monkeypatch.setattr('drive_database.drive_cache.DRIVE_CACHE_PATH', cache_path)
+    return cache_path
+
+
+def restored_from(monkeypatch, backup_name):
+    """Fakes the restore history of the database to show the backup."""
+    monkeypatch.setitem(
+        sys.modules, 'drive_database.database_operations',
+        SimpleNamespace(get_restored_backup_name=lambda: backup_name))
+
+
+def test_restore_fresh_after_recent_check(drive_cache, monkeypatch):
+    drive_cache.write_text(json.dumps({'name': 'VatBillingSoftware_1.bak', 'checked_at': time.time()}))
+    restored_from(monkeypatch, 'VatBillingSoftware_1.bak')
+
+    assert run.is_restore_fresh()
+
+
+def test_restore_not_fresh_after_stale_check(drive_cache, monkeypatch):
+    checked_at = time.time() - run.BACKUP_FRESHNESS_WINDOW - 1
+    drive_cache.write_text(json.dumps({'name': 'VatBillingSoftware_1.bak', 'checked_at': checked_at}))
+    restored_from(monkeypatch, 'VatBillingSoftware_1.bak')
+
+    assert not run.is_restore_fresh()
+
+
+def test_restore_not_fresh_when_restored_from_another_backup(drive_cache, monkeypatch):
+    drive_cache.write_text(json.dumps({'name': 'VatBillingSoftware_2.bak', 'checked_at': time.time()}))
+    restored_from(monkeypatch, 'VatBillingSoftware_1.bak')
+
+    assert not run.is_restore_fresh()
+
+
+def test_restore_not_fresh_without_check(drive_cache):
+    drive_cache.write_text(json.dumps({'name': 'VatBillingSoftware_1.bak'}))
+
+    assert not run.is_restore_fresh()
+
+
+def test_fast_start_skips_drive(monkeypatch, tmp_path):
+    monkeypatch.setattr(run, 'is_restore_fresh', lambda: True)
+    # Reaching the Drive check would fail on the missing token
+    monkeypatch.setattr(run, 'TOKEN_PATH', tmp_path / 'token.json')
+
+    run.sync_latest_backup(fast_start=True)
+
+
+def test_sync_without_fast_start_checks_drive(monkeypatch, tmp_path):
+    monkeypatch.setattr(run, 'is_restore_fresh', lambda: True)
+    monkeypatch.setattr(run, 'TOKEN_PATH', tmp_path / 'token.json')
+
+    with pytest.raises(FileNotFoundError):
+        run.sync_latest_backup(fast_start=False)
+
+
+@pytest.mark.parametrize("restored", [False, True])
+def test_sync_stamps_check_only_when_restored(drive_cache, monkeypatch, tmp_path, restored):
+    token_path = tmp_path / 'token.json'
+    token_path.touch()
+    monkeypatch.setattr(run, 'TOKEN_PATH', token_path)
+    monkeypatch.setattr('drive_database.credential_handler.get_cached_credentials', lambda: None)
+    monkeypatch.setattr('drive_database.drive.retrive_latest_file_by_pattern',
+                        lambda creds, file_pattern: {'name': 'VatBillingSoftware_2.bak'})
+    # The restore of the latest backup is declined or fails, or it succeeds
+    monkeypatch.setattr(run, 'perform_restore', lambda file, creds: restored)
+
+    run.sync_latest_backup()
+
+    cache = json.loads(drive_cache.read_text()) if drive_cache.exists() else {}
+    assert ('checked_at' in cache) is restored
+
+
+def restore_backup(monkeypatch):
+    """Fakes the download and the restore of the drive file, returning the restored files."""
+    restored = []
+    monkeypatch.setattr('drive_database.drive.download_drive_file', lambda creds, file: file['name'])
+    monkeypatch.setitem(
+        sys.modules, 'drive_database.database_operations',
+        SimpleNamespace(restore=lambda filepath: restored.append(filepath) or True))
+    return restored
+
+
+def test_perform_restore_skips_restored_backup(drive_cache, monkeypatch):
+    drive_cache.write_text(json.dumps({
+        'name': 'VatBillingSoftware_1.bak',
+        'restore_history': [{'name': 'VatBillingSoftware_1.bak', 'md5Checksum': 'abc',
+                             'restored_at': '2026-10-01T10:00:00'}],
+    }))
+    restored = restore_backup(monkeypatch)
+
+    assert run.perform_restore({'name': 'VatBillingSoftware_1.bak', 'md5Checksum': 'abc'}, None)
+    assert restored == []
+
+
+def test_perform_restore_retries_failed_restore(drive_cache, monkeypatch):
+    # The backup was downloaded, but its restore failed
+    drive_cache.write_text(json.dumps({'name': 'VatBillingSoftware_1.bak', 'md5Checksum': 'abc'}))
+    restored = restore_backup(monkeypatch)
+
+    assert run.perform_restore({'name': 'VatBillingSoftware_1.bak', 'md5Checksum': 'abc'}, None)
+    assert restored == ['VatBillingSoftware_1.bak']
+
+
+def test_perform_restore_asks_for_another_backup(drive_cache, monkeypatch):
+    drive_cache.write_text(json.dumps({
+        'name': 'VatBillingSoftware_2.bak',
+        'restore_history': [{'name': 'VatBillingSoftware_1.bak', 'md5Checksum': 'abc',
+                             'restored_at': '2026-10-01T10:00:00'}],
+    }))
+    restored = restore_backup(monkeypatch)
+    monkeypatch.setattr('builtins.input', lambda prompt: 'n')
+
+    assert not run.perform_restore({'name': 'VatBillingSoftware_2.bak', 'md5Checksum': 'def'}, None)
+    assert restored == []
@@ -12,6 +12,13 @@ from src.exceptions import BookNameNotFoundError, FileValidationError
 from src.template_file import TemplateFile
 
 
+@pytest.fixture(autouse=True)
+def template_cache_dir(tmp_path):
+    cache_dir = tmp_path / "cache"
+    with patch("src.template_file.TEMPLATE_CACHE_DIR", cache_dir):
+        yield cache_dir
+
+
 @pytest.fixture
 def book_mock():
     book = Mock(
@@ -102,3 +109,47 @@ def test_get_hash_value_invalid(template_file):
         template_file.get_hash_value('invalid_book')
 
     assert 'Please check HASH_VALUE in configurations settings' in str(e)
+
+
+@patch("src.template_file.TemplateFile.get_hash_value")
+def test_get_caches_download(patched_get_hash, template_file, book_mock, cbms_mock, mock_response, template_cache_dir):
+
+    content_hash = hashlib.md5(mock_response.content).hexdigest()
+    patched_get_hash.return_value = content_hash
+    cbms_mock.get.return_value = mock_response
+
+    template_file.get(book_mock)
+    content = template_file.get(book_mock)
+
+    assert content.getvalue() == mock_response.content
+    assert (template_cache_dir / f"{content_hash}.xlsx").read_bytes() == mock_response.content
+    cbms_mock.get.assert_called_once()
+
+
+@patch("src.template_file.TemplateFile.get_hash_value")
+def test_get_cache_hash_mismatch(patched_get_hash, template_file, book_mock, cbms_mock, mock_response, template_cache_dir):
+
+    content_hash = hashlib.md5(mock_response.content).hexdigest()
+    patched_get_hash.return_value = content_hash
+    template_cache_dir.mkdir()
+    (template_cache_dir / f"{content_hash}.xlsx").write_bytes(b'truncated')
+    cbms_mock.get.return_value = mock_response
+
+    content = template_file.get(book_mock)
+
+    assert content.getvalue() == mock_response.content
+    assert (template_cache_dir / f"{content_hash}.xlsx").read_bytes() == mock_response.content
+    cbms_mock.get.assert_called_once()
+
+
+@patch("src.template_file.TemplateFile.get_hash_value")
+def test_get_refresh(patched_get_hash, template_file, book_mock, cbms_mock, mock_response):
+
+    patched_get_hash.return_value = hashlib.md5(
+        mock_response.content).hexdigest()
+    cbms_mock.get.return_value = mock_response
+
+    template_file.get(book_mock)
+    template_file.get(book_mock, refresh=True)
+
+    assert cbms_mock.get.call_count == 2
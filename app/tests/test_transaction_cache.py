@@ -0,0 +1,134 @@
+import json
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+from src.date_range import ADDateRange
+from src.transaction_cache import TransactionCache, Watermark, get_watermark
+
+
+@pytest.fixture
+def date_range():
+    return ADDateRange(date(2023, 10, 18), date(2023, 11, 16))
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        "Transaction ID": [11, 13],
+        "Bill Receiveable Person": ["ABC Inn", None],
+        "Grand Total": [52_987.0, 2_000.5],
+        "Bill Date": pd.to_datetime(["2023-10-18", "2023-11-01"]),
+    }, index=[0, 2])
+
+
+@pytest.fixture
+def drive_cache_path(tmp_path, monkeypatch):
+    drive_cache_path = tmp_path / "drive_cache.json"
+    monkeypatch.setattr('src.transaction_cache.DRIVE_CACHE_PATH', drive_cache_path)
+    monkeypatch.setattr('src.transaction_cache.TRANSACTION_CACHE_DIR', tmp_path / "cache")
+    return drive_cache_path
+
+
+def write_restore_history(drive_cache_path, *restores):
+    drive_cache_path.write_text(json.dumps({
+        # The latest download is only cached, not yet restored
+        "datetime": "2023-12-17T10:00:00",
+        "name": "VatBillingSoftware_2023_12.bak",
+        "restore_history": [
+            {"name": name, "md5Checksum": md5_checksum, "restored_at": restored_at}
+            for name, md5_checksum, restored_at in restores
+        ],
+    }))
+
+
+def test_for_current_backup(drive_cache_path):
+    assert TransactionCache.for_current_backup() is None
+
+    write_restore_history(
+        drive_cache_path, ("VatBillingSoftware_2023_11.bak", "a1", "2023-11-17T10:00:00"))
+    cache = TransactionCache.for_current_backup("SELECT 1")
+
+    assert cache.backup_name == "VatBillingSoftware_2023_11.bak"
+    assert cache.backup_dir.name.startswith("VatBillingSoftware_2023_11_")
+
+
+def test_same_name_backup_invalidates_snapshots(drive_cache_path, date_range, transactions):
+    write_restore_history(drive_cache_path, ("backup.bak", "a1", "2023-11-17T10:00:00"))
+    TransactionCache.for_current_backup("SELECT 1").write(1, date_range, transactions, [])
+    assert TransactionCache.for_current_backup("SELECT 1").read(1, date_range) is not None
+
+    # The backup was uploaded again under the same name and restored
+    write_restore_history(
+        drive_cache_path,
+        ("backup.bak", "a1", "2023-11-17T10:00:00"),
+        ("backup.bak", "b2", "2023-11-18T10:00:00"),
+    )
+
+    assert TransactionCache.for_current_backup("SELECT 1").read(1, date_range) is None
+
+
+def test_query_shape_invalidates_snapshots(drive_cache_path, date_range, transactions):
+    write_restore_history(drive_cache_path, ("backup.bak", "a1", "2023-11-17T10:00:00"))
+    TransactionCache.for_current_backup("SELECT 1").write(1, date_range, transactions, [])
+
+    assert TransactionCache.for_current_backup("SELECT 2").read(1, date_range) is None
+    assert TransactionCache.for_current_backup("SELECT 1", ["Bill Date"]).read(1, date_range) is None
+    assert TransactionCache.for_current_backup("SELECT 2").read_previous(1, date_range) is None
+
+
+def test_read_missing_snapshot(tmp_path, date_range):
+    assert TransactionCache("backup.bak", tmp_path).read(1, date_range) is None
+
+
+def test_write_and_read(tmp_path, date_range, transactions):
+    cache = TransactionCache("backup.bak", tmp_path)
+
+    cache.write(1, date_range, transactions, [pd.Series([12]).iloc[0]])
+    dataframe, cancelled_transactions, watermark = cache.read(1, date_range)
+
+    pd.testing.assert_frame_equal(dataframe, transactions, check_dtype=False)
+    assert cancelled_transactions == [12]
+    assert watermark == Watermark(13, datetime(2023, 11, 1))
+    assert cache.read(2, date_range) is None
+
+
+def test_get_watermark(transactions):
+    assert get_watermark(transactions) == Watermark(13, datetime(2023, 11, 1))
+    assert get_watermark(transactions.iloc[:0]) is None
+    assert get_watermark(transactions.drop(columns="Bill Date")) is None
+
+
+def test_newer_backup_invalidates_snapshots(tmp_path, date_range, transactions):
+    TransactionCache("backup_1.bak", tmp_path).write(1, date_range, transactions, [])
+
+    cache = TransactionCache("backup_2.bak", tmp_path)
+    assert cache.read(1, date_range) is None
+
+    cache.write(1, date_range, transactions, [])
+    assert [path.name for path in tmp_path.iterdir()] == ["backup_2"]
+
+
+def test_read_previous_snapshot(tmp_path, date_range, transactions):
+    TransactionCache("backup_1.bak", tmp_path).write(1, date_range, transactions, [12])
+    TransactionCache("backup_1.bak", tmp_path).write(2, date_range, transactions, [])
+    cache = TransactionCache("backup_2.bak", tmp_path)
+
+    previous = cache.read_previous(1, date_range)
+    assert previous.cancelled_transactions == [12]
+    assert previous.watermark == Watermark(13, datetime(2023, 11, 1))
+
+    # Writing book 1 keeps the previous snapshot of book 2
+    cache.write(1, date_range, transactions, [])
+    assert cache.read_previous(1, date_range) is None
+    assert cache.read_previous(2, date_range) is not None
+
+
+def test_write_failure_leaves_no_snapshot(tmp_path, date_range):
+    cache = TransactionCache("backup.bak", tmp_path)
+    unwritable = pd.DataFrame({"mixed": [1, "a"]})
+
+    cache.write(1, date_range, unwritable, [])
+
+    assert cache.read(1, date_range) is None
+    assert list(cache.backup_dir.iterdir()) == []